@@ -1,24 +1,99 @@
+import asyncio
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
+
+from agents.free_slots import FreeSlotIndex
+from agents.llm_client import GEMINI_MODEL, default_model_name, get_llm, json_chain
+from agents.profiling import count, span
+from agents.response_cache import ResponseCache, cache_key
+from agents.time_slots import format_slot, parse_slot_minutes, window_minutes
+from agents.scheduling_engine import TOO_LATE, schedule_dataframe
 
 load_dotenv()
 
+# Latency budget for one reschedule request (seconds); past it the local free slot wins.
+LLM_DEADLINE = float(os.getenv("LIFELOOP_LLM_DEADLINE", 4.0))
+
+
+def _run_sync(coro):
+    """
+    Runs a coroutine from sync code (including callers already inside an event
+    loop). Unlike asyncio.run, closing the loop does not wait for executor
+    threads still stuck on a provider call past the deadline.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(_run_sync, coro).result()
+
+
+RESCHEDULE_PROMPT = """You are a smart scheduling assistant.
+Given a skipped task and user focus pattern, suggest a valid new time slot 
+within the user's working hours.
+
+Task: {task_name}
+Focus pattern: {pattern_summary}
+Working hours: {user_start} - {user_end}
+
+Respond only in JSON:
+{{
+  "time_slot": "HH:MM AM/PM - HH:MM AM/PM",
+  "reason": "short justification"
+}}"""
+
+BATCH_RESCHEDULE_PROMPT = """You are a smart scheduling assistant.
+Several tasks were skipped today. Suggest a new time slot for each of them
+within the user's working hours, avoiding the busy slots and each other.
+
+Skipped tasks (id: task, duration):
+{tasks}
+Busy slots: {busy_slots}
+Focus pattern: {pattern_summary}
+Working hours: {user_start} - {user_end}
+
+Respond only in JSON:
+{{
+  "slots": [
+    {{"id": 0, "time_slot": "HH:MM AM/PM - HH:MM AM/PM", "reason": "short justification"}}
+  ]
+}}"""
+
 
 class AIScheduler:
-    def __init__(self):
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("Missing GOOGLE_API_KEY in environment.")
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0.7,
-            api_key=api_key
-        )
+    def __init__(self, deadline=None, llm=None):
+        # Seconds an LLM call may take before the local free slot is used instead
+        self.deadline = LLM_DEADLINE if deadline is None else deadline
+        # None -> the process-wide client of LIFELOOP_LLM_BACKEND, created on the
+        # first AI call; any LangChain chat model (e.g. offline_llm()) plugs in here
+        self._llm = llm
+        # Raw LLM answers keyed on the normalised prompt inputs (TTL + LRU, on disk)
+        self.response_cache = ResponseCache()
+
+    @property
+    def llm(self):
+        return self._llm if self._llm is not None else get_llm()
+
+    @property
+    def model_name(self):
+        """Model id for cache keys, known without building the client."""
+        return getattr(self._llm, "model", GEMINI_MODEL) if self._llm is not None else default_model_name()
+
+    def cache_stats(self):
+        """Hit/miss counters for cached reschedule suggestions."""
+        return self.response_cache.stats()
+
+    def _deadline(self, deadline=None):
+        return self.deadline if deadline is None else deadline
 
     # ----------------------------------------------------------
     # Analyze user pattern
@@ -35,124 +110,119 @@ class AIScheduler:
             return "Night: low focus, avoid heavy cognitive tasks."
 
     # ----------------------------------------------------------
-    # Convert "HH:MM AM - HH:MM PM" → datetime pairs
+    # Convert "HH:MM AM - HH:MM PM" → (start, end) minutes
     # ----------------------------------------------------------
     def _parse_slot(self, slot_str):
-        try:
-            start_str, end_str = [s.strip() for s in slot_str.replace("(AI)", "").split("-")]
-            start = datetime.strptime(start_str, "%I:%M %p")
-            end = datetime.strptime(end_str, "%I:%M %p")
-            return start, end
-        except Exception:
-            return None, None
+        return parse_slot_minutes(slot_str) or (None, None)
 
     # ----------------------------------------------------------
     # Find nearest available non-overlapping slot
     # ----------------------------------------------------------
-    def _find_free_slot(self, existing_slots, user_start, user_end, duration_minutes=30):
+    def _find_free_slot(self, existing_slots, user_start, user_end, duration_minutes=30, step=15):
         """
         Finds the next available gap that doesn’t overlap any existing slots.
+        Candidates start on a `step`-minute grid from user_start (1 = minute granularity).
+        """
+        window_start, window_end = window_minutes(user_start, user_end)
+        index = FreeSlotIndex.from_slots(existing_slots, window_start, window_end, step)
+
+        start = index.earliest(duration_minutes)
+        if start is None:
+            # If no gap found, push to end of day (still safe)
+            start = window_end - duration_minutes
+        return format_slot(start, start + duration_minutes)
+
+    def find_free_slots(self, existing_slots, user_start, user_end, duration_minutes=30, step=15):
+        """Every free gap in the work window that can hold duration_minutes, earliest first."""
+        index = FreeSlotIndex.from_slots(existing_slots, *window_minutes(user_start, user_end), step)
+        return [format_slot(start, end) for start, end in index.gaps(duration_minutes)]
+
+    # ----------------------------------------------------------
+    # Batch scheduling of a whole draft plan
+    # ----------------------------------------------------------
+    def schedule_plan(self, df, user_start="08:00 AM", user_end="09:00 PM", fixed_slots=None):
+        """
+        Packs every task of a draft DataFrame (Task, Priority, Duration_min) into
+        the work window around fixed_slots ("HH:MM AM - HH:MM PM" strings).
+        Returns the "Time Slot" strings in row order.
         """
-        # Convert to datetime objects
-        user_start_dt = datetime.strptime(user_start, "%I:%M %p")
-        user_end_dt = datetime.strptime(user_end, "%I:%M %p")
-
-        # Parse and sort existing slots
-        booked = []
-        for slot in existing_slots:
-            s, e = self._parse_slot(slot)
-            if s and e:
-                booked.append((s, e))
-        booked.sort(key=lambda x: x[0])
-
-        # Start scanning for gaps
-        candidate_start = user_start_dt
-        while candidate_start + timedelta(minutes=duration_minutes) <= user_end_dt:
-            candidate_end = candidate_start + timedelta(minutes=duration_minutes)
-            overlap = False
-
-            for s, e in booked:
-                if not (candidate_end <= s or candidate_start >= e):
-                    overlap = True
-                    break
-
-            if not overlap:
-                return f"{candidate_start.strftime('%I:%M %p')} - {candidate_end.strftime('%I:%M %p')}"
-
-            candidate_start = candidate_start + timedelta(minutes=15)
-
-        # If no gap found, push to end of day (still safe)
-        fallback_start = user_end_dt - timedelta(minutes=duration_minutes)
-        fallback_end = user_end_dt
-        return f"{fallback_start.strftime('%I:%M %p')} - {fallback_end.strftime('%I:%M %p')}"
+        start_dt = datetime.strptime(user_start, "%I:%M %p")
+        end_dt = datetime.strptime(user_end, "%I:%M %p")
+        if start_dt >= end_dt:
+            end_dt += timedelta(days=1)
+        fixed_blocks = [b for b in map(parse_slot_minutes, fixed_slots or []) if b is not None]
+        return schedule_dataframe(df, start_dt, end_dt, fixed_blocks)
 
     # ----------------------------------------------------------
     # Validate slot within user range
     # ----------------------------------------------------------
     def _validate_time_slot(self, time_slot, user_start, user_end):
-        try:
-            start_str, end_str = [t.strip() for t in time_slot.split("-")]
-            start_dt = datetime.strptime(start_str, "%I:%M %p")
-            end_dt = datetime.strptime(end_str, "%I:%M %p")
-        except Exception:
+        slot = parse_slot_minutes(time_slot)
+        if slot is None:
             return None
+        start, end = slot
+        window_start, window_end = window_minutes(user_start, user_end)
 
-        user_start_dt = datetime.strptime(user_start, "%I:%M %p")
-        user_end_dt = datetime.strptime(user_end, "%I:%M %p")
-
-        if start_dt < user_start_dt:
-            start_dt = user_start_dt
-            end_dt = start_dt + timedelta(minutes=30)
-        if end_dt > user_end_dt:
-            end_dt = user_end_dt
-            start_dt = end_dt - timedelta(minutes=30)
+        if start < window_start:
+            start, end = window_start, window_start + 30
+        if end > window_end:
+            start, end = window_end - 30, window_end
 
-        return f"{start_dt.strftime('%I:%M %p')} - {end_dt.strftime('%I:%M %p')}"
+        return format_slot(start, end)
 
     # ----------------------------------------------------------
     # Main Rescheduler (The corrected function name)
     # ----------------------------------------------------------
-    def suggest_reschedule(
+    async def _ainvoke_within(self, template, inputs, deadline=None):
+        """
+        Runs the cached JSON chain for a prompt template for at most `deadline`
+        seconds. Returns (result, timed_out); result is {} on timeout or on
+        provider/setup errors (e.g. no API key), so callers fall back locally.
+        """
+        count("llm.calls")
+        with span("llm.ainvoke", model=self.model_name):
+            try:
+                chain = json_chain(template, self.llm)
+                return await asyncio.wait_for(chain.ainvoke(inputs), timeout=self._deadline(deadline)), False
+            except asyncio.TimeoutError:
+                count("llm.timeouts")
+                return {}, True
+            except Exception:
+                count("llm.errors")
+                return {}, False
+
+    async def asuggest_reschedule(
         self,
         task_name,
         pattern_summary,
         user_start="08:00 AM",
         user_end="09:00 PM",
-        existing_slots=None
+        existing_slots=None,
+        deadline=None
     ):
         """
-        Uses Gemini to suggest reschedule time and avoids overlaps.
+        Non-blocking suggest_reschedule: the Gemini call gets `deadline` seconds,
+        after which the local free slot is returned instead.
         """
         if existing_slots is None:
             existing_slots = []
 
-        prompt = ChatPromptTemplate.from_template(
-            """You are a smart scheduling assistant.
-Given a skipped task and user focus pattern, suggest a valid new time slot 
-within the user's working hours.
-
-Task: {task_name}
-Focus pattern: {pattern_summary}
-Working hours: {user_start} - {user_end}
-
-Respond only in JSON:
-{{
-  "time_slot": "HH:MM AM/PM - HH:MM AM/PM",
-  "reason": "short justification"
-}}"""
+        # Slots are re-validated against the current plan below, so only the
+        # prompt inputs go into the key.
+        key = cache_key(
+            "reschedule", self.model_name, task_name, pattern_summary, *window_minutes(user_start, user_end)
         )
-
-        chain = prompt | self.llm | JsonOutputParser()
-
-        try:
-            result = chain.invoke({
+        result = self.response_cache.get(key)
+        timed_out = False
+        if result is None:
+            result, timed_out = await self._ainvoke_within(RESCHEDULE_PROMPT, {
                 "task_name": task_name,
                 "pattern_summary": pattern_summary,
                 "user_start": user_start,
                 "user_end": user_end
-            })
-        except Exception:
-            result = {}
+            }, deadline)
+            if isinstance(result, dict) and "time_slot" in result:
+                self.response_cache.set(key, result)
 
         if isinstance(result, dict) and "time_slot" in result:
             validated = self._validate_time_slot(result["time_slot"], user_start, user_end)
@@ -160,9 +230,114 @@ Respond only in JSON:
             validated = None
 
         if not validated:
+            # Local answer: microseconds, so it only waits on a failed or late LLM
             validated = self._find_free_slot(existing_slots, user_start, user_end)
+            if timed_out:
+                result = {"reason": f"Nearest free slot (AI did not answer within {self._deadline(deadline):g}s)."}
 
         return {
             "time_slot": validated,
             "reason": result.get("reason", "AI-selected free non-overlapping slot.")
-        }
\ No newline at end of file
+        }
+
+    def suggest_reschedule(
+        self,
+        task_name,
+        pattern_summary,
+        user_start="08:00 AM",
+        user_end="09:00 PM",
+        existing_slots=None,
+        deadline=None
+    ):
+        """
+        Uses Gemini to suggest reschedule time and avoids overlaps.
+        Bounded by `deadline` seconds (LIFELOOP_LLM_DEADLINE by default).
+        """
+        return _run_sync(self.asuggest_reschedule(
+            task_name, pattern_summary, user_start, user_end, existing_slots, deadline
+        ))
+
+    # ----------------------------------------------------------
+    # Batch Rescheduler: one LLM call for every skipped task
+    # ----------------------------------------------------------
+    async def asuggest_reschedule_batch(
+        self,
+        tasks,
+        pattern_summary,
+        user_start="08:00 AM",
+        user_end="09:00 PM",
+        existing_slots=None,
+        not_before=None,
+        deadline=None
+    ):
+        """
+        Reschedules several skipped tasks with a single Gemini call.
+
+        tasks is a list of {"task": name, "duration": minutes}; existing_slots
+        are the slots of the rest of the plan. Returns one {"time_slot", "reason"}
+        per task, in order, none of which overlap existing_slots or each other.
+        Tasks with no room left get "N/A - Too Late". not_before (minutes since
+        midnight) keeps new slots out of the past.
+        """
+        if not tasks:
+            return []
+        window_start, window_end = window_minutes(user_start, user_end)
+        not_before = window_start if not_before is None else max(window_start, not_before)
+        busy = [b for b in map(parse_slot_minutes, existing_slots or []) if b is not None]
+        durations = [max(1, int(t.get("duration") or 30)) for t in tasks]
+
+        key = cache_key(
+            "reschedule_batch", self.model_name, pattern_summary, window_start, window_end,
+            [t["task"] for t in tasks], durations, sorted(busy),
+        )
+        result = self.response_cache.get(key)
+        if result is None:
+            result, _ = await self._ainvoke_within(BATCH_RESCHEDULE_PROMPT, {
+                "tasks": "\n".join(f"{i}: {t['task']}, {d} min" for i, (t, d) in enumerate(zip(tasks, durations))),
+                "busy_slots": ", ".join(format_slot(s, e) for s, e in sorted(busy)) or "none",
+                "pattern_summary": pattern_summary,
+                "user_start": user_start,
+                "user_end": user_end
+            }, deadline)
+            if isinstance(result, dict) and isinstance(result.get("slots"), list):
+                self.response_cache.set(key, result)
+
+        suggested = {}
+        for item in (result.get("slots") or []) if isinstance(result, dict) else []:
+            try:
+                suggested[int(item["id"])] = item
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        # Joint validation: accept suggestions in order, each one becoming busy
+        # for the next; anything invalid or clashing takes the earliest free gap.
+        results = []
+        for i, duration in enumerate(durations):
+            item = suggested.get(i, {})
+            validated = self._validate_time_slot(str(item.get("time_slot", "")), user_start, user_end)
+            slot = parse_slot_minutes(validated) if validated else None
+            if slot is None or slot[0] < not_before or any(s < slot[1] and slot[0] < e for s, e in busy):
+                start = FreeSlotIndex(busy, window_start, window_end).earliest(duration, after=not_before)
+                if start is None:
+                    results.append({"time_slot": TOO_LATE, "reason": "No free slot left in the work window."})
+                    continue
+                slot = (start, start + duration)
+                item = {"reason": "AI-selected free non-overlapping slot."}
+            busy.append(slot)
+            results.append({"time_slot": format_slot(*slot), "reason": item.get("reason", "AI-selected free non-overlapping slot.")})
+        return results
+
+    def suggest_reschedule_batch(
+        self,
+        tasks,
+        pattern_summary,
+        user_start="08:00 AM",
+        user_end="09:00 PM",
+        existing_slots=None,
+        not_before=None,
+        deadline=None
+    ):
+        """Blocking wrapper around asuggest_reschedule_batch (same deadline rules)."""
+        return _run_sync(self.asuggest_reschedule_batch(
+            tasks, pattern_summary, user_start, user_end, existing_slots, not_before, deadline
+        ))
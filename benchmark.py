@@ -0,0 +1,329 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+# ----------------------------------------------------------
+# 🧩 Path Setup (same layout as main.py)
+# ----------------------------------------------------------
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "agents")))
+
+from agents.ai_scheduler import AIScheduler
+from agents.calendar_export import _cache as ics_cache, generate_ics_file
+from agents.charts import _cache as chart_cache, VEGA_SPECS, figure_function, render_chart
+from agents.context_agent import ContextAgent
+from agents.history_agent import HistoryAgent
+from agents.history_store import get_history_store
+from agents.llm_client import offline_llm
+from agents.metrics import calculate_metrics, metrics_from_summaries
+from agents.response_cache import ResponseCache
+from agents.scheduling_engine import schedule_dataframe
+from agents.time_slots import format_slot
+
+TASK_NAMES = ["Write report", "Gym", "Dinner with family", "Email", "Evening walk", "Study", "Relax",
+              "Team sync", "Code review", "Read 20 pages", "Groceries", "Plan tomorrow"]
+DURATIONS = [15, 30, 45, 60, 90, 120]
+TIME_LABELS = {15: "15 min", 30: "30 min", 45: "45 min", 60: "1 hour", 90: "1.5 hours", 120: "2 hours"}
+PRIORITIES = ["High", "Medium", "Low"]
+
+# (users, days per user, (min, max) tasks per day)
+SCALES = {
+    "small": (1_000, 30, (5, 15)),
+    "medium": (1_000, 365, (5, 50)),
+    "wide": (100_000, 7, (5, 20)),
+    "deep": (1_000, 3 * 365, (5, 50)),
+}
+
+
+# ----------------------------------------------------------
+# Synthetic data (history.json schema)
+# ----------------------------------------------------------
+def synthetic_day(rng, n_tasks, day_start=8 * 60, day_end=21 * 60):
+    """One saved day: {"Task", "Priority", "Time", "Completed", "Time Slot"} column lists."""
+    day = {"Task": [], "Priority": [], "Time": [], "Completed": [], "Time Slot": []}
+    cursor = day_start
+    for _ in range(n_tasks):
+        duration = rng.choice(DURATIONS)
+        day["Task"].append(rng.choice(TASK_NAMES))
+        day["Priority"].append(rng.choice(PRIORITIES))
+        day["Time"].append(TIME_LABELS[duration])
+        day["Completed"].append(rng.random() < 0.6)
+        if cursor + duration <= day_end:
+            day["Time Slot"].append(format_slot(cursor, cursor + duration))
+            cursor += duration + rng.choice([0, 5, 10, 15])
+        else:
+            day["Time Slot"].append("N/A - Too Late")
+    return day
+
+
+def synthetic_history(n_users, n_days, tasks_per_day, seed=0, end=date(2025, 1, 31)):
+    """{username: {YYYY-MM-DD: day}} for n_users users, each with n_days consecutive days."""
+    rng = random.Random(seed)
+    lo, hi = tasks_per_day
+    dates = [(end - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(n_days)][::-1]
+    return {
+        f"user{u:06d}": {d: synthetic_day(rng, rng.randint(lo, hi)) for d in dates}
+        for u in range(n_users)
+    }
+
+
+def synthetic_plan(n_tasks, seed=0):
+    """Random draft plan shaped like the planner's DataFrame."""
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "Task": [rng.choice(TASK_NAMES) for _ in range(n_tasks)],
+        "Priority": [rng.choice(PRIORITIES) for _ in range(n_tasks)],
+        "Duration_min": [rng.choice(DURATIONS) for _ in range(n_tasks)],
+    })
+
+
+# ----------------------------------------------------------
+# Timing helpers
+# ----------------------------------------------------------
+def timed(fn, repeat, setup=None):
+    """Runs fn `repeat` times (setup() untimed before each) -> stats in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        fn(arg) if setup else fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "n": len(samples),
+        "min_ms": samples[0],
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean_ms": statistics.fmean(samples),
+    }
+
+
+def _log(name, stats):
+    print(f"{name:<52} median {stats['median_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms", file=sys.stderr)
+
+
+# ----------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------
+def bench_history(history, backend, repeat, seed=0):
+    """save_date / load_last_n_days / metrics on a store pre-filled with `history`."""
+    rng = random.Random(seed)
+    users = list(history)
+    results = {}
+
+    get_history_store(backend).save_all(history)
+    agent = HistoryAgent(backend=backend, parquet_dir="")
+    next_day = [date(2025, 2, 1)]
+
+    def save(_):
+        username = rng.choice(users)
+        agent.save_date(username, next_day[0].strftime("%Y-%m-%d"), pd.DataFrame(synthetic_day(rng, 20)))
+        next_day[0] += timedelta(days=1)
+
+    results["history.save_date"] = timed(save, repeat, setup=lambda: None)
+
+    def cold_load(username):
+        agent._cache.clear()
+        agent.load_last_n_days(username, 7)
+
+    results["history.load_last_n_days (cold)"] = timed(cold_load, repeat, setup=lambda: rng.choice(users))
+    username = users[0]
+    agent.load_last_n_days(username, 7)
+    results["history.load_last_n_days (cached)"] = timed(lambda: agent.load_last_n_days(username, 7), repeat)
+
+    week = history[username]
+    results["metrics.calculate_metrics (7 days)"] = timed(lambda: calculate_metrics(week, last_n=7), repeat)
+    results["metrics.calculate_metrics (all days)"] = timed(lambda: calculate_metrics(week), repeat)
+    agent.load_summaries(username, 7)
+    results["metrics.metrics_from_summaries (7 days)"] = timed(
+        lambda: metrics_from_summaries(agent.load_summaries(username, 7)), repeat
+    )
+    return results
+
+
+def bench_plan_ops(repeat, n_tasks=50, seed=0):
+    """Per-plan operations on one n_tasks day."""
+    rng = random.Random(seed)
+    day = pd.DataFrame(synthetic_day(rng, n_tasks, day_end=28 * 60))
+    results = {}
+
+    def shuffled():
+        context = ContextAgent()
+        context.df = day.sample(frac=1, random_state=rng.randrange(1 << 30)).reset_index(drop=True)
+        return context
+
+    results[f"context._chronological_sort ({n_tasks} tasks)"] = timed(lambda c: c._chronological_sort(), repeat, setup=shuffled)
+    results[f"context.reschedule_task ({n_tasks} tasks)"] = timed(lambda c: c.reschedule_task(0), repeat, setup=shuffled)
+
+    scheduler = AIScheduler(llm=offline_llm())
+    slots = day["Time Slot"].tolist()
+    results[f"scheduler._find_free_slot ({n_tasks} slots)"] = timed(
+        lambda: scheduler._find_free_slot(slots, "08:00 AM", "11:00 PM", 30), repeat
+    )
+    results[f"calendar_export.generate_ics_file ({n_tasks} tasks)"] = timed(
+        lambda _: generate_ics_file(day, datetime(2025, 1, 31)), repeat, setup=ics_cache.clear
+    )
+    results[f"calendar_export.generate_ics_file ({n_tasks} tasks, cached)"] = timed(
+        lambda: generate_ics_file(day, datetime(2025, 1, 31)), repeat
+    )
+    return results
+
+
+def bench_scheduler(repeat, n_tasks=200, budget_ms=100):
+    """schedule_dataframe on a 08:00-22:00 window; the best run must stay under budget."""
+    plan = synthetic_plan(n_tasks)
+    start_dt, end_dt = datetime(2025, 1, 1, 8), datetime(2025, 1, 1, 22)
+    stats = timed(lambda: schedule_dataframe(plan, start_dt, end_dt), repeat)
+    stats["budget_ms"] = budget_ms
+    assert stats["min_ms"] < budget_ms, f"scheduler took {stats['min_ms']:.1f} ms for {n_tasks} tasks"
+    return {f"scheduling_engine.schedule_dataframe ({n_tasks} tasks)": stats}
+
+
+def bench_charts(repeat, n_days=30, seed=0):
+    """The two weekly-insight charts: matplotlib PNG (cold / cached) vs. Vega-Lite spec."""
+    rng = random.Random(seed)
+    daily_progress = {(date(2025, 1, 1) + timedelta(days=i)).isoformat(): rng.uniform(0, 100) for i in range(n_days)}
+    priority_df = pd.DataFrame({"Priority": PRIORITIES, "Total": [12, 20, 9], "Completed": [7, 11, 2]})
+    charts = {"daily_progress": (daily_progress, n_days), "priority_breakdown": (priority_df,)}
+    results = {}
+    for name, args in charts.items():
+        plot_fn = figure_function(name)
+        results[f"charts.render_chart {name} (cold)"] = timed(
+            lambda _: render_chart(plot_fn, *args), max(3, repeat // 4), setup=chart_cache.clear
+        )
+        results[f"charts.render_chart {name} (cached)"] = timed(lambda: render_chart(plot_fn, *args), repeat)
+        results[f"charts.vega spec {name}"] = timed(lambda: json.dumps(VEGA_SPECS[name](*args)), repeat)
+    return results
+
+
+def bench_reschedule(repeat, latency=0.02, jitter=0.01, failure_rate=0.1, deadline=0.05):
+    """
+    End-to-end suggest_reschedule against the offline LLM stand-in (no network,
+    no response cache).
+    """
+    scheduler = AIScheduler(
+        deadline=deadline,
+        llm=offline_llm(latency=latency, jitter=jitter, failure_rate=failure_rate, seed=0),
+    )
+    scheduler.response_cache = ResponseCache(path="")
+    existing = ["08:00 AM - 09:00 AM", "10:00 AM - 11:30 AM", "01:00 PM - 02:00 PM"]
+    counter = iter(range(1 << 30))
+    stats = timed(
+        lambda: scheduler.suggest_reschedule(f"Task {next(counter)}", "Morning: high focus.", existing_slots=existing),
+        repeat,
+    )
+    stats.update({"llm_latency_ms": latency * 1000, "llm_failure_rate": failure_rate, "deadline_ms": deadline * 1000})
+    return {"scheduler.suggest_reschedule (offline LLM)": stats}
+
+
+# ----------------------------------------------------------
+# Runner
+# ----------------------------------------------------------
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scale="small", users=None, days=None, tasks=None, backend="json", repeat=20, seed=0):
+    n_users, n_days, tasks_per_day = SCALES[scale]
+    n_users, n_days, tasks_per_day = users or n_users, days or n_days, tasks or tasks_per_day
+
+    t0 = time.perf_counter()
+    history = synthetic_history(n_users, n_days, tasks_per_day, seed)
+    print(f"generated {n_users} users x {n_days} days in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="lifeloop-bench-") as workdir:
+        # Stores and summaries use relative default paths; keep them out of the repo
+        os.chdir(workdir)
+        try:
+            results.update(bench_history(history, backend, repeat, seed))
+        finally:
+            os.chdir(cwd)
+    results.update(bench_plan_ops(repeat, seed=seed))
+    results.update(bench_scheduler(max(5, repeat // 4)))
+    results.update(bench_charts(repeat, seed=seed))
+    results.update(bench_reschedule(repeat))
+    for name, stats in results.items():
+        _log(name, stats)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": scale,
+            "users": n_users,
+            "days": n_days,
+            "tasks_per_day": list(tasks_per_day),
+            "backend": backend,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=1.25):
+    """Names whose median slowed down by more than `threshold`x against a previous report."""
+    regressions = {}
+    for name, stats in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old and old["median_ms"] > 0:
+            ratio = stats["median_ms"] / old["median_ms"]
+            if ratio > threshold:
+                regressions[name] = round(ratio, 2)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LifeLoop hot-path benchmarks (JSON report on stdout or --output).")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--users", type=int, help="override the scale's user count")
+    parser.add_argument("--days", type=int, help="override the scale's days per user")
+    parser.add_argument("--tasks", type=int, nargs=2, metavar=("MIN", "MAX"), help="override tasks per day")
+    parser.add_argument("--backend", default="json", help="history backend: json, journal, sharded or sqlite")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="previous JSON report; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="median slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    report = run(args.scale, args.users, args.days, tuple(args.tasks) if args.tasks else None,
+                 args.backend, args.repeat, args.seed)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for name, ratio in regressions.items():
+            print(f"REGRESSION {name}: {ratio}x slower", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+import orjson
+import pandas as pd
+
+from agents.time_slots import SLOT_END, SLOT_START, with_slot_columns
+
+USER_TIMEZONE = os.getenv("LIFELOOP_TIMEZONE", "US/Eastern")
+# Serialized calendars kept in memory, keyed on a hash of their content
+ICS_CACHE_SIZE = int(os.getenv("LIFELOOP_ICS_CACHE_SIZE", 32))
+
+PRODID = "-//LifeLoop//Daily AI Planner//EN"
+EXPORT_COLUMNS = ["Task", "Priority", "Completed", "Time Slot"]
+
+_cache = OrderedDict()  # digest -> ics text
+_cache_lock = threading.Lock()
+
+
+def _base_date(active_date):
+    if isinstance(active_date, datetime):
+        return active_date.date()
+    if isinstance(active_date, str):
+        return date.fromisoformat(active_date[:10])
+    return active_date
+
+
+def _escape(text):
+    """RFC 5545 TEXT escaping."""
+    return (
+        str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """Folds a content line at 75 octets (continuations start with a space)."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, limit = [], 75
+    while raw:
+        cut = min(limit, len(raw))
+        # Never split a multi-byte character
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(raw[:cut].decode("utf-8"))
+        raw, limit = raw[cut:], 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _event_lines(df, active_date):
+    """VEVENT text for every row with a valid slot, in start order."""
+    base_date = _base_date(active_date)
+    day_key = base_date.isoformat()
+    df = with_slot_columns(df)
+    df = df[df[SLOT_START].notna() & df[SLOT_END].notna()]
+    if df.empty:
+        return ""
+
+    # Integer minutes since midnight (overnight ends are already past 1440);
+    # local times that do not exist or are ambiguous around DST changes are skipped
+    day_start = pd.Timestamp(base_date)
+
+    def to_utc(minutes):
+        local = pd.DatetimeIndex(day_start + pd.to_timedelta(minutes.astype("int64").to_numpy(), unit="min"))
+        return local.tz_localize(USER_TIMEZONE, ambiguous="NaT", nonexistent="NaT").tz_convert("UTC")
+
+    starts, ends = to_utc(df[SLOT_START]), to_utc(df[SLOT_END])
+    valid = ~(starts.isna() | ends.isna())
+    events = pd.DataFrame({
+        "start": starts[valid].strftime("%Y%m%dT%H%M%SZ"),
+        "end": ends[valid].strftime("%Y%m%dT%H%M%SZ"),
+        "task": df["Task"].to_numpy()[valid],
+        "priority": (df["Priority"] if "Priority" in df.columns else pd.Series("", index=df.index)).to_numpy()[valid],
+        "done": (df["Completed"] if "Completed" in df.columns else pd.Series(False, index=df.index)).to_numpy()[valid],
+        "row": df.index.to_numpy()[valid],
+    }).sort_values("start", kind="stable")
+
+    chunks = []
+    for start, end, task, priority, done, row in events.itertuples(index=False):
+        # Stable UIDs: re-importing an updated export replaces events instead of duplicating them
+        uid = hashlib.sha1(f"{day_key}|{row}|{task}".encode()).hexdigest()[:20]
+        chunks.append(
+            "BEGIN:VEVENT\r\n"
+            + _fold(f"DESCRIPTION:{_escape(f'Priority: {priority}')}\\n{_escape('Status: ' + ('Done' if done else 'Pending'))}")
+            + f"DTEND:{end}\r\nDTSTART:{start}\r\n"
+            + _fold(f"SUMMARY:{_escape(f'LifeLoop: {task}')}")
+            + f"UID:{uid}@lifeloop\r\nEND:VEVENT\r\n"
+        )
+    return "".join(chunks)
+
+
+def iter_ics(days):
+    """
+    Streams one VCALENDAR for (date, plan) pairs, day by day. A plan is a
+    DataFrame or a saved history day ({column: [values]}).
+    """
+    yield f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{PRODID}\r\n"
+    for day, plan in days:
+        if not isinstance(plan, pd.DataFrame):
+            plan = pd.DataFrame(plan)
+        if "Task" in plan.columns and "Time Slot" in plan.columns:
+            yield _event_lines(plan, day)
+    yield "END:VCALENDAR\r\n"
+
+
+def plan_digest(df, active_date):
+    """Content hash of the exported columns of a plan and its date."""
+    cols = [c for c in EXPORT_COLUMNS if c in df.columns]
+    h = hashlib.sha1(f"{_base_date(active_date)}|{USER_TIMEZONE}|{','.join(cols)}".encode())
+    # Plain lists through orjson: far cheaper than hash_pandas_object on a few dozen rows
+    h.update(orjson.dumps([df.index.tolist()] + [df[c].tolist() for c in cols], default=str))
+    return h.hexdigest()
+
+
+def _memoized(digest, build):
+    with _cache_lock:
+        if digest in _cache:
+            _cache.move_to_end(digest)
+            return _cache[digest]
+    text = build()
+    with _cache_lock:
+        _cache[digest] = text
+        while len(_cache) > ICS_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return text
+
+
+def generate_ics_file(df, active_date):
+    """
+    Converts the LifeLoop DataFrame into an .ics calendar file with Timezone
+    support. Memoized on the plan's content, so unchanged plans are not
+    serialized again.
+    """
+    return _memoized(plan_digest(df, active_date), lambda: "".join(iter_ics([(active_date, df)])))
+
+
+def generate_ics_range(days):
+    """
+    One calendar for several days, e.g. HistoryAgent.load_range(...).items().
+    Memoized like generate_ics_file.
+    """
+    days = list(days)
+    h = hashlib.sha1(f"range|{USER_TIMEZONE}".encode())
+    for day, plan in days:
+        h.update(str(_base_date(day)).encode())
+        h.update(plan_digest(plan, day).encode() if isinstance(plan, pd.DataFrame) else orjson.dumps(plan))
+    return _memoized(h.hexdigest(), lambda: "".join(iter_ics(days)))
@@ -0,0 +1,260 @@
+import hashlib
+import io
+import os
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+import orjson
+import pandas as pd
+
+from agents.profiling import count
+
+# "matplotlib" (default): cached PNGs; "vega": Vega-Lite specs drawn by the
+# browser, so matplotlib is never imported.
+CHART_BACKEND = os.getenv("LIFELOOP_CHART_BACKEND", "matplotlib").lower()
+# Rendered chart bytes kept in memory, keyed on the chart and a hash of its inputs
+CHART_CACHE_SIZE = int(os.getenv("LIFELOOP_CHART_CACHE_SIZE", 128))
+CHART_DPI = 200  # what st.pyplot renders with
+
+# Dark theme shared by every figure (same palette as the page CSS), applied
+# once per render through rc_context instead of restyling each axes
+DARK_THEME = {
+    "figure.facecolor": "#0d1117",
+    "savefig.facecolor": "#0d1117",
+    "axes.facecolor": "#161b22",
+    "axes.edgecolor": "#c9d1d9",
+    "axes.labelcolor": "#c9d1d9",
+    "axes.titlecolor": "#58a6ff",
+    "axes.spines.top": False,
+    "axes.spines.right": False,
+    "xtick.color": "#c9d1d9",
+    "ytick.color": "#c9d1d9",
+    "text.color": "#c9d1d9",
+    "legend.facecolor": "#161b22",
+    "legend.edgecolor": "#21262d",
+    "legend.labelcolor": "#c9d1d9",
+}
+
+_cache = OrderedDict()  # key -> bytes
+_cache_lock = threading.Lock()
+_render_lock = threading.Lock()  # matplotlib state is not thread-safe
+
+
+def _jsonable(value):
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict("split")
+    if isinstance(value, pd.Series):
+        return value.to_dict()
+    return str(value)
+
+
+def chart_key(name, *args, **kwargs):
+    """Hash of a chart name and the data it is drawn from."""
+    payload = orjson.dumps([name, args, kwargs], default=_jsonable, option=orjson.OPT_NON_STR_KEYS)
+    return hashlib.sha1(payload).hexdigest()
+
+
+def render_chart(plot_fn, *args, fmt="png", **kwargs):
+    """
+    PNG (or SVG) bytes of plot_fn(*args, **kwargs), a function returning a
+    matplotlib Figure. Unchanged inputs are served from memory without
+    touching matplotlib; rendered figures are closed right away.
+    """
+    name = f"{plot_fn.__module__}.{plot_fn.__qualname__}"
+    key = chart_key(name, fmt, *args, **kwargs)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            count("charts.cache_hits")
+            return _cache[key]
+
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    with _render_lock, matplotlib.rc_context(DARK_THEME):
+        fig = plot_fn(*args, **kwargs)
+        try:
+            buf = io.BytesIO()
+            fig.savefig(buf, format=fmt, dpi=CHART_DPI, bbox_inches="tight")
+        finally:
+            plt.close(fig)
+    count("charts.renders")
+    data = buf.getvalue()
+
+    with _cache_lock:
+        _cache[key] = data
+        while len(_cache) > CHART_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return data
+
+
+# ----------------------------------------------------------
+# Weekly insights charts
+# ----------------------------------------------------------
+def _figure():
+    """Themed (figure, axes) pair, outside pyplot's global figure registry."""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(6, 3))
+    return fig, fig.subplots()
+
+
+def plot_daily_progress(daily_progress, window_days=7):
+    """Generates a bar chart for daily progress."""
+    dates = sorted(daily_progress.keys())
+    progress = [daily_progress[date] for date in dates]
+
+    # Use only day and month for cleaner x-axis labels
+    labels = [datetime.strptime(d, "%Y-%m-%d").strftime("%m/%d") for d in dates]
+
+    fig, ax = _figure()
+    ax.bar(labels, progress, color="#58a6ff")
+    ax.set_ylabel("Progress (%)")
+    ax.set_title(f"Task Completion Last {window_days} Days")
+    ax.tick_params(axis='x', rotation=45)
+    fig.tight_layout()
+    return fig
+
+
+def plot_priority_breakdown(priority_df):
+    """Generates a stacked bar chart for task completion by priority."""
+    fig, ax = _figure()
+
+    if priority_df.empty:
+        ax.text(0.5, 0.5, "No task data to display.", horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
+        return fig
+
+    # Sort to ensure consistent order
+    priority_order = ['High', 'Medium', 'Low']
+    priority_df = priority_df.assign(
+        Pending=priority_df['Total'] - priority_df['Completed'],
+        SortOrder=priority_df['Priority'].map(lambda x: priority_order.index(x) if x in priority_order else 99),
+    ).sort_values(by='SortOrder')
+
+    priorities = priority_df['Priority']
+    completed = priority_df['Completed']
+    pending = priority_df['Pending']
+
+    # Plot stacked bar
+    ax.bar(priorities, completed, label='Completed', color='#2f81f7')
+    ax.bar(priorities, pending, bottom=completed, label='Pending', color='#30363d')
+
+    ax.set_ylabel("Number of Tasks")
+    ax.set_title("Completion by Priority")
+    ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
+    fig.tight_layout()
+    return fig
+
+
+def figure_function(name):
+    """
+    matplotlib plot function for a dashboard chart. The visualization module
+    (and with it matplotlib.pyplot) is only imported on first use.
+    """
+    if name in ("completion_bar", "status_pie"):
+        from agents import visualization
+
+        return getattr(visualization, f"plot_{name}")
+    return {"daily_progress": plot_daily_progress, "priority_breakdown": plot_priority_breakdown}[name]
+
+
+# ----------------------------------------------------------
+# Vega-Lite specs (LIFELOOP_CHART_BACKEND=vega)
+# ----------------------------------------------------------
+VEGA_CONFIG = {
+    "background": DARK_THEME["figure.facecolor"],
+    "view": {"fill": DARK_THEME["axes.facecolor"], "stroke": None},
+    "axis": {
+        "domainColor": DARK_THEME["axes.edgecolor"],
+        "tickColor": DARK_THEME["xtick.color"],
+        "labelColor": DARK_THEME["xtick.color"],
+        "titleColor": DARK_THEME["axes.labelcolor"],
+        "gridColor": "#21262d",
+    },
+    "legend": {"labelColor": DARK_THEME["text.color"], "titleColor": DARK_THEME["text.color"]},
+    "title": {"color": DARK_THEME["axes.titlecolor"]},
+}
+
+
+def _vega(data, title=None, height=220, **spec):
+    spec = {"data": {"values": data}, "height": height, "config": VEGA_CONFIG, **spec}
+    if title:
+        spec["title"] = title
+    return spec
+
+
+def completion_bar_spec(progress):
+    """Horizontal 0-100% bar for today's progress."""
+    return _vega(
+        [{"label": "Progress", "progress": round(float(progress), 1)}],
+        height=80,
+        mark={"type": "bar", "color": "#58a6ff"},
+        encoding={
+            "x": {"field": "progress", "type": "quantitative", "scale": {"domain": [0, 100]}, "title": "Completion (%)"},
+            "y": {"field": "label", "type": "nominal", "title": None},
+            "tooltip": [{"field": "progress", "type": "quantitative", "title": "Progress (%)"}],
+        },
+    )
+
+
+def status_pie_spec(task_data):
+    """Donut of task counts per status ({"task", "status"} rows, counted here)."""
+    counts = Counter(t["status"] for t in task_data)
+    return _vega(
+        [{"status": status, "tasks": n} for status, n in counts.items()],
+        mark={"type": "arc", "innerRadius": 40},
+        encoding={
+            "theta": {"field": "tasks", "type": "quantitative"},
+            "color": {
+                "field": "status", "type": "nominal", "title": None,
+                "scale": {"domain": ["completed", "pending"], "range": ["#2f81f7", "#30363d"]},
+            },
+            "tooltip": [{"field": "status"}, {"field": "tasks", "type": "quantitative"}],
+        },
+    )
+
+
+def daily_progress_spec(daily_progress, window_days=7):
+    """Bar per saved day ({YYYY-MM-DD: progress %})."""
+    return _vega(
+        [{"day": day, "progress": round(float(daily_progress[day]), 1)} for day in sorted(daily_progress)],
+        title=f"Task Completion Last {window_days} Days",
+        mark={"type": "bar", "color": "#58a6ff"},
+        encoding={
+            "x": {"field": "day", "type": "ordinal", "timeUnit": "monthdate", "title": None, "axis": {"labelAngle": -45}},
+            "y": {"field": "progress", "type": "quantitative", "title": "Progress (%)"},
+            "tooltip": [{"field": "day", "type": "nominal"}, {"field": "progress", "type": "quantitative"}],
+        },
+    )
+
+
+def priority_breakdown_spec(priority_df):
+    """Completed/pending stack per priority (metrics_from_summaries priority_df)."""
+    rows = []
+    for priority, total, completed in priority_df[["Priority", "Total", "Completed"]].itertuples(index=False):
+        rows.append({"priority": priority, "status": "Completed", "tasks": int(completed)})
+        rows.append({"priority": priority, "status": "Pending", "tasks": int(total - completed)})
+    return _vega(
+        rows,
+        title="Completion by Priority",
+        mark="bar",
+        encoding={
+            "x": {"field": "priority", "type": "nominal", "sort": ["High", "Medium", "Low"], "title": None, "axis": {"labelAngle": 0}},
+            "y": {"field": "tasks", "type": "quantitative", "title": "Number of Tasks"},
+            "color": {
+                "field": "status", "type": "nominal", "title": None,
+                "scale": {"domain": ["Completed", "Pending"], "range": ["#2f81f7", "#30363d"]},
+            },
+            "order": {"field": "status", "sort": "ascending"},
+            "tooltip": [{"field": "priority"}, {"field": "status"}, {"field": "tasks", "type": "quantitative"}],
+        },
+    )
+
+
+VEGA_SPECS = {
+    "completion_bar": completion_bar_spec,
+    "status_pie": status_pie_spec,
+    "daily_progress": daily_progress_spec,
+    "priority_breakdown": priority_breakdown_spec,
+}
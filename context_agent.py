@@ -1,5 +1,6 @@
 import pandas as pd
-from datetime import datetime, timedelta
+
+from agents.time_slots import SLOT_END, SLOT_START, chronological, shift_slots, with_slot_columns
 
 class ContextAgent:
     """Tracks task completion, rescheduling, and computes progress."""
@@ -28,25 +29,8 @@ class ContextAgent:
     # NEW: Chronological Sort Helper
     # ------------------------------------------------------------------
     def _chronological_sort(self):
-        """Sorts the DataFrame based on the start time in the 'Time Slot' column."""
-        
-        def sort_key(slot):
-            """Helper function to extract datetime object for sorting."""
-            if pd.isna(slot) or 'N/A' in str(slot):
-                return datetime.max
-            try:
-                # Extract the start time string (e.g., '08:00 AM')
-                start_str = str(slot).split(' - ')[0].strip()
-                return datetime.strptime(start_str, '%I:%M %p')
-            except Exception:
-                # Put invalid time slots at the end
-                return datetime.max
-
-        self.df = self.df.sort_values(
-            by="Time Slot", 
-            key=lambda x: x.apply(sort_key), 
-            ignore_index=True
-        )
+        """Sorts the DataFrame by slot start (integer minutes); invalid slots go last."""
+        self.df = chronological(self.df)
 
     # ------------------------------------------------------------------
     # FIX: Reschedule Task with Auto-Sort
@@ -71,21 +55,17 @@ class ContextAgent:
             return f"Task '{task_name}' is already marked as N/A and cannot be rescheduled."
 
         try:
-            start_str, end_str = time_slot.split(" - ")
-            start = datetime.strptime(start_str.strip(), "%I:%M %p")
-            end = datetime.strptime(end_str.strip(), "%I:%M %p")
-            duration = end - start
-            
-            # Calculate 30% shift
-            shift = timedelta(minutes=duration.total_seconds() / 60 * 0.3)
-            
-            new_start = start + shift
-            new_end = end + shift
-            new_slot = f"{new_start.strftime('%I:%M %p')} - {new_end.strftime('%I:%M %p')}"
-            
-            # Update the time slot using .iloc for row safety
-            self.df.iloc[idx, self.df.columns.get_loc("Time Slot")] = new_slot
-            
+            self.df = with_slot_columns(self.df)
+            start = self.df.iat[idx, self.df.columns.get_loc(SLOT_START)]
+            end = self.df.iat[idx, self.df.columns.get_loc(SLOT_END)]
+            if pd.isna(start) or pd.isna(end):
+                raise ValueError(time_slot)
+
+            # Calculate 30% shift (whole minutes, rounded down like the clock display)
+            shift = (int(end) - int(start)) * 3 // 10
+            self.df = shift_slots(self.df, [self.df.index[idx]], shift)
+            new_slot = self.df.iat[idx, self.df.columns.get_loc("Time Slot")]
+
             # Perform the chronological sort
             self._chronological_sort() # <-- ADDED: Sorting the DataFrame after update
             
@@ -0,0 +1,213 @@
+import bisect
+import json
+import os
+import threading
+from datetime import date, timedelta
+
+# Legacy flat array written by the reflection agent, and the indexed store replacing it
+DAILY_REFLECTIONS_FILE = "daily_reflections.json"
+DAILY_REFLECTIONS_DB = os.getenv("LIFELOOP_DAILY_REFLECTIONS_DB", "daily_reflections.db")
+ROLLING_WINDOW_DAYS = 7
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def _counts(entry):
+    completed = int(entry.get("completed_count") or 0)
+    return completed, completed + int(entry.get("skipped_count") or 0)
+
+
+class DailyReflectionStore:
+    """
+    SQLite (via SQLAlchemy) store of daily reflections, one row per
+    (username, date). The composite primary key is the index: point lookups
+    and date-range scans are B-tree seeks. Each row also carries running
+    totals of completed/planned tasks for its user, so a rolling completion
+    rate over any window is two indexed reads instead of a scan.
+    """
+
+    def __init__(self, url=None):
+        # Deferred so importing this module does not pay for SQLAlchemy.
+        from sqlalchemy import Column, Float, Integer, MetaData, String, Table, Text, create_engine
+
+        self.engine = create_engine(url or f"sqlite:///{DAILY_REFLECTIONS_DB}", future=True)
+        metadata = MetaData()
+        self.table = Table(
+            "daily_reflections",
+            metadata,
+            Column("username", String, primary_key=True),
+            Column("date", String, primary_key=True),
+            Column("completed", Integer, nullable=False),
+            Column("planned", Integer, nullable=False),
+            Column("completion_rate", Float),
+            Column("cum_completed", Integer, nullable=False),
+            Column("cum_planned", Integer, nullable=False),
+            Column("data", Text, nullable=False),
+        )
+        metadata.create_all(self.engine)
+        self._lock = threading.Lock()  # running totals are read-modify-write
+
+    # -------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------
+    def _upsert(self, conn, rows):
+        from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(self.table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["username", "date"],
+            set_={c: stmt.excluded[c] for c in ("completed", "planned", "completion_rate", "data")},
+        )
+        conn.execute(stmt, rows)
+
+    def _reaccumulate(self, conn, username, from_date):
+        """Recomputes the running totals of one user from from_date onwards."""
+        from sqlalchemy import bindparam
+
+        t = self.table
+        base = conn.execute(
+            t.select().with_only_columns(t.c.cum_completed, t.c.cum_planned)
+            .where(t.c.username == username, t.c.date < from_date)
+            .order_by(t.c.date.desc()).limit(1)
+        ).first()
+        cum_completed, cum_planned = base if base else (0, 0)
+        updates = []
+        for row in conn.execute(
+            t.select().with_only_columns(t.c.date, t.c.completed, t.c.planned)
+            .where(t.c.username == username, t.c.date >= from_date)
+            .order_by(t.c.date)
+        ):
+            cum_completed += row.completed
+            cum_planned += row.planned
+            updates.append({"u": username, "d": row.date, "cc": cum_completed, "cp": cum_planned})
+        if updates:
+            conn.execute(
+                t.update()
+                .where(t.c.username == bindparam("u"), t.c.date == bindparam("d"))
+                .values(cum_completed=bindparam("cc"), cum_planned=bindparam("cp")),
+                updates,
+            )
+
+    def _row(self, username, entry):
+        completed, planned = _counts(entry)
+        return {
+            "username": username,
+            "date": entry["date"],
+            "completed": completed,
+            "planned": planned,
+            "completion_rate": entry.get("completion_rate"),
+            "cum_completed": 0,  # filled in by _reaccumulate
+            "cum_planned": 0,
+            "data": json.dumps(entry),
+        }
+
+    def save(self, username, entry):
+        """Upserts one reflection (entry["date"] is YYYY-MM-DD)."""
+        self.import_entries([entry], username)
+
+    def import_entries(self, entries, username):
+        """
+        Bulk upsert of reflection entries for one user, e.g. the legacy flat
+        array (which has no username). Later entries for the same date win.
+        Returns the number of distinct days written.
+        """
+        by_date = {e["date"]: e for e in entries if e.get("date")}
+        if not by_date:
+            return 0
+        with self._lock, self.engine.begin() as conn:
+            self._upsert(conn, [self._row(username, e) for e in by_date.values()])
+            self._reaccumulate(conn, username, min(by_date))
+        return len(by_date)
+
+    # -------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------
+    def get(self, username, day):
+        """The reflection for one user and date, or None."""
+        t = self.table
+        with self.engine.connect() as conn:
+            payload = conn.execute(
+                t.select().with_only_columns(t.c.data).where(t.c.username == username, t.c.date == day)
+            ).scalar()
+        return json.loads(payload) if payload is not None else None
+
+    def range(self, username, start_date, end_date):
+        """{date: reflection} for start_date <= date <= end_date, oldest first."""
+        t = self.table
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                t.select().with_only_columns(t.c.date, t.c.data)
+                .where(t.c.username == username, t.c.date.between(start_date, end_date))
+                .order_by(t.c.date)
+            )
+            return {row.date: json.loads(row.data) for row in rows}
+
+    def last_n(self, username, n):
+        """{date: reflection} for the N most recent days, newest first."""
+        t = self.table
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                t.select().with_only_columns(t.c.date, t.c.data)
+                .where(t.c.username == username)
+                .order_by(t.c.date.desc()).limit(n)
+            )
+            return {row.date: json.loads(row.data) for row in rows}
+
+    def rolling_completion(self, username, start_date, end_date, window=ROLLING_WINDOW_DAYS):
+        """
+        {date: % of planned tasks completed over the `window` calendar days
+        ending on that date} for every reflected day in [start_date, end_date]
+        (None when nothing was planned in the window).
+        """
+        t = self.table
+        lo = (date.fromisoformat(start_date) - timedelta(days=window)).isoformat()
+        with self.engine.connect() as conn:
+            base = conn.execute(
+                t.select().with_only_columns(t.c.cum_completed, t.c.cum_planned)
+                .where(t.c.username == username, t.c.date <= lo)
+                .order_by(t.c.date.desc()).limit(1)
+            ).first()
+            rows = conn.execute(
+                t.select().with_only_columns(t.c.date, t.c.cum_completed, t.c.cum_planned)
+                .where(t.c.username == username, t.c.date > lo, t.c.date <= end_date)
+                .order_by(t.c.date)
+            ).all()
+
+        # Running totals at the last reflected day on or before each date
+        dates = [lo] + [row.date for row in rows]
+        totals = [tuple(base) if base else (0, 0)] + [(row.cum_completed, row.cum_planned) for row in rows]
+        series = {}
+        for row in rows:
+            if row.date < start_date:
+                continue
+            window_start = (date.fromisoformat(row.date) - timedelta(days=window)).isoformat()
+            before = totals[bisect.bisect_right(dates, window_start) - 1]
+            completed, planned = row.cum_completed - before[0], row.cum_planned - before[1]
+            series[row.date] = (completed / planned) * 100 if planned else None
+        return series
+
+
+def get_daily_reflection_store(url=None):
+    """Process-wide store (one engine per database URL)."""
+    key = url or DAILY_REFLECTIONS_DB
+    with _STORES_LOCK:
+        if key not in _STORES:
+            _STORES[key] = DailyReflectionStore(url)
+        return _STORES[key]
+
+
+def import_daily_reflections(username, json_path=DAILY_REFLECTIONS_FILE, store=None):
+    """One-shot import of the legacy flat array under `username`; returns the days written."""
+    with open(json_path, 'r') as f:
+        entries = json.load(f)
+    return (store or get_daily_reflection_store()).import_entries(entries, username)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        sys.exit(f"usage: python -m agents.daily_reflections USERNAME  (imports {DAILY_REFLECTIONS_FILE})")
+    copied = import_daily_reflections(sys.argv[1])
+    print(f"Imported {copied} day(s) from {DAILY_REFLECTIONS_FILE} into {DAILY_REFLECTIONS_DB}.")
@@ -0,0 +1,48 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Minutes used when a "Time" string has no usable duration in it.
+DEFAULT_MINUTES = 30
+
+# One grammar for every "Time" string we see: "1 hour", "1.5 hours", "45 min",
+# "1 hour 30 min", "1h30", "2hrs", "90", plus unit-only forms like "an hour".
+# A number without a unit counts as minutes ("1h30" -> 60 + 30).
+_DURATION_RE = re.compile(
+    r"(?P<num>\d+(?:\.\d+)?|\.\d+)\s*(?:(?P<unit>hours?|hrs?|h|minutes?|mins?|m)(?![a-z]))?"
+    r"|\b(?P<half>half\s+(?:an?\s+)?)?(?P<word>hour|hr)s?\b"
+)
+
+
+@lru_cache(maxsize=4096)
+def parse_duration(text, default=DEFAULT_MINUTES):
+    """
+    Minutes in a task "Time" string ("1.5 hours" -> 90, "1h30" -> 90, "45" -> 45).
+    Returns `default` when nothing parseable (or nothing positive) is found.
+    """
+    total, found = 0.0, False
+    for match in _DURATION_RE.finditer(str(text).lower()):
+        found = True
+        if match.group("word"):
+            total += 30 if match.group("half") else 60
+            continue
+        value = float(match.group("num"))
+        unit = match.group("unit")
+        total += value * 60 if unit and unit.startswith("h") else value
+    minutes = int(round(total))
+    return minutes if found and minutes > 0 else default
+
+
+def parse_durations(times, default=DEFAULT_MINUTES):
+    """
+    Vectorized parse_duration over a whole "Time" column. Each distinct string
+    is parsed once. Returns int64, or nullable Int64 when default is None.
+    """
+    times = pd.Series(times)
+    # astype(str) turns missing values into "nan", which parses to the default
+    codes, uniques = pd.factorize(times.astype(str))
+    parsed = [parse_duration(t, default) for t in uniques]
+    values = pd.array(parsed, dtype="Int64") if default is None else np.array(parsed, dtype=np.int64)
+    return pd.Series(values.take(codes) if len(parsed) else values[:0], index=times.index)
@@ -0,0 +1,86 @@
+import bisect
+
+from agents.time_slots import parse_slot_minutes
+
+
+class FreeSlotIndex:
+    """
+    Free intervals of a work window, built once from the booked slots.
+
+    Gaps are stored sorted with their start aligned to the candidate grid
+    (window_start + k * step), and a max-tree over their usable lengths
+    answers "earliest gap of >= N minutes at or after T" in O(log n).
+    Touching slots do not overlap (a task may start when another ends).
+    """
+
+    def __init__(self, busy, window_start, window_end, step=15):
+        self.window_start = window_start
+        self.window_end = window_end
+        self.step = max(1, int(step))
+
+        self._starts, self._ends = [], []
+        cursor = window_start
+        for start, end in sorted(busy):
+            if cursor >= window_end:
+                break
+            if start > cursor:
+                self._add_gap(cursor, min(start, window_end))
+            cursor = max(cursor, end)
+        if cursor < window_end:
+            self._add_gap(cursor, window_end)
+
+        usable = [e - s for s, e in zip(self._starts, self._ends)]
+        self._size = 1
+        while self._size < max(1, len(usable)):
+            self._size *= 2
+        self._tree = [-1] * (2 * self._size)
+        self._tree[self._size:self._size + len(usable)] = usable
+        for node in range(self._size - 1, 0, -1):
+            self._tree[node] = max(self._tree[2 * node], self._tree[2 * node + 1])
+
+    @classmethod
+    def from_slots(cls, slot_strings, window_start, window_end, step=15):
+        """Builds the index from display strings; unparseable slots ("N/A") are ignored."""
+        busy = [b for b in map(parse_slot_minutes, slot_strings) if b is not None]
+        return cls(busy, window_start, window_end, step)
+
+    def _align(self, minute):
+        """Rounds up onto the candidate grid."""
+        offset = max(0, minute - self.window_start)
+        return self.window_start + -(-offset // self.step) * self.step
+
+    def _add_gap(self, start, end):
+        aligned = self._align(start)
+        if aligned < end:
+            self._starts.append(aligned)
+            self._ends.append(end)
+
+    def _first_fitting(self, lo, duration):
+        """Smallest gap index >= lo whose usable length is >= duration, or -1."""
+        tree, size = self._tree, self._size
+
+        def descend(node, left, right):
+            if right <= lo or tree[node] < duration:
+                return -1
+            if right - left == 1:
+                return left
+            mid = (left + right) // 2
+            found = descend(2 * node, left, mid)
+            return found if found != -1 else descend(2 * node + 1, mid, right)
+
+        return descend(1, 0, size)
+
+    def earliest(self, duration, after=None):
+        """Start minute of the earliest free [start, start + duration], or None."""
+        after = self._align(self.window_start if after is None else after)
+        i = bisect.bisect_left(self._ends, after)
+        if i < len(self._starts):
+            start = max(self._starts[i], after)
+            if start + duration <= self._ends[i]:
+                return start
+        j = self._first_fitting(i + 1, duration)
+        return self._starts[j] if j != -1 else None
+
+    def gaps(self, min_duration=0):
+        """Every free (start, end) interval that can hold min_duration minutes."""
+        return [(s, e) for s, e in zip(self._starts, self._ends) if e - s >= min_duration]
@@ -1,70 +1,174 @@
-import json
 import os
 from datetime import datetime
 
-# The file where all daily progress will be saved.
-HISTORY_FILE = "history.json"
+from agents.history_store import HISTORY_FILE, get_history_store
+from agents.history_summaries import DailySummaryIndex
+from agents.profiling import count, span
+from agents.time_slots import SLOT_COLUMNS
+
+# Storage backend for daily progress: "json" (history.json), "journal"
+# (history.json + append-only history.journal), "sharded" (history/<user>/<month>.json)
+# or "sqlite" (history.db).
+HISTORY_BACKEND = os.getenv("LIFELOOP_HISTORY_BACKEND", "json")
+# Optional partitioned Parquet mirror (e.g. "history_parquet") kept in sync by save_date.
+HISTORY_PARQUET = os.getenv("LIFELOOP_HISTORY_PARQUET", "")
 
 class HistoryAgent:
     """Manages persistence for daily task data and handles history retrieval."""
-    
-    def __init__(self):
-        pass
+
+    def __init__(self, backend=None, parquet_dir=None):
+        self.store = get_history_store(backend or HISTORY_BACKEND)
+        self.parquet_dir = parquet_dir if parquet_dir is not None else HISTORY_PARQUET
+        # Per-day totals maintained at save time for dashboards
+        self.summaries = DailySummaryIndex()
+        # Parsed reads per user: {username: (token, {query: result})}
+        self._cache = {}
+        # Bumped by every save_date so our own writes always invalidate the cache,
+        # even when the filesystem's mtime granularity is too coarse to notice.
+        self._version = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _cached(self, username, query, loader):
+        """
+        Serves a read from the per-user cache, calling loader() only when the
+        query is new or the store has changed since it was cached.
+        """
+        token = (self._version, self.store.version(username))
+        entry = self._cache.get(username)
+        if entry is None or entry[0] != token:
+            entry = (token, {})
+            self._cache[username] = entry
+
+        results = entry[1]
+        if query in results:
+            self.cache_hits += 1
+            return results[query]
+
+        self.cache_misses += 1
+        count("history.disk_reads")
+        with span(f"history.{query[0]}", username=username):
+            results[query] = loader()
+        return results[query]
+
+    def cache_stats(self):
+        """Hit/miss counters for the per-user history cache."""
+        total = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": self.cache_hits / total if total else 0.0,
+            "cached_users": len(self._cache),
+        }
 
     def _load_all_history(self):
-        """Loads all existing history from the JSON file."""
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, 'r') as f:
-                try:
-                    # Load the history structure: {username: {date: {task_data}}}
-                    return json.load(f)
-                except json.JSONDecodeError:
-                    # Return empty dict if file is corrupt or empty
-                    return {}
-        return {}
-    
+        """Loads all existing history: {username: {date: {task_data}}}."""
+        return self.store.load_all()
+
     def _save_all_history(self, data):
-        """Saves all history to the JSON file."""
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
+        """Saves all history through the active backend."""
+        self.store.save_all(data)
+        self._version += 1
+        self._cache.clear()
+        for username in data:
+            self.summaries.drop(username)
 
     def save_date(self, username, date, df):
         """Saves a DataFrame (daily progress) for a specific user and date."""
-        data = self._load_all_history()
-        
         # Convert DataFrame to a serializable dictionary format for storage
-        daily_data = df.to_dict(orient='list')
+        # (the integer slot columns are derived from "Time Slot" and not persisted)
+        daily_data = df.drop(columns=SLOT_COLUMNS, errors='ignore').to_dict(orient='list')
+        count("history.disk_writes")
+        with span("history.save_day", username=username, date=date):
+            self.store.save_day(username, date, daily_data)
+        self._version += 1
+        self._cache.pop(username, None)
+        if self.summaries.has(username):
+            self.summaries.update(username, date, daily_data)
+        else:
+            self._ensure_summaries(username)
+
+        if self.parquet_dir:
+            self._refresh_parquet_month(username, date[:7])
 
-        if username not in data:
-            data[username] = {}
-            
-        data[username][date] = daily_data
-        self._save_all_history(data)
+    def load_date(self, username, date):
+        """Loads the saved columns for one user and date, or None if missing."""
+        return self._cached(username, ("date", date), lambda: self.store.load_date(username, date))
 
     # -------------------------------------------------------------
     # FIX: load_last_n_days method
     # -------------------------------------------------------------
     def load_last_n_days(self, username, n=7):
         """Loads the last N days of history data for a specific user."""
-        all_data = self._load_all_history()
-        
-        if username not in all_data:
-            return {}
-        
-        user_history = all_data[username]
-        
-        # Sort dates chronologically (most recent first)
-        # Dates must be sorted as strings, assuming YYYY-MM-DD format
-        sorted_dates = sorted(user_history.keys(), reverse=True)
-        
-        # Select the last N days
-        last_n_history = {}
-        for date_str in sorted_dates[:n]:
-            last_n_history[date_str] = user_history[date_str]
-            
-        return last_n_history
+        # Most recent first; dates are YYYY-MM-DD so string order is chronological
+        return self._cached(username, ("last_n", n), lambda: self.store.load_last_n_days(username, n))
+
+    def load_range(self, username, start_date, end_date):
+        """Loads saved days between two YYYY-MM-DD dates (inclusive), oldest first."""
+        return self._cached(
+            username,
+            ("range", start_date, end_date),
+            lambda: self.store.load_range(username, start_date, end_date),
+        )
+
+    # -------------------------------------------------------------
+    # Pre-aggregated daily summaries (dashboards)
+    # -------------------------------------------------------------
+    def _ensure_summaries(self, username):
+        """Backfills summaries once for users whose history predates them."""
+        if not self.summaries.has(username):
+            self.summaries.rebuild(username, self.store.load_user(username))
+
+    def load_summaries(self, username, n=7):
+        """
+        {date: {"total", "completed", "minutes", "priority"}} for the last N
+        saved days, newest first, without reading the raw task lists.
+        """
+        self._ensure_summaries(username)
+        return self.summaries.last_n(username, n)
+
+    def summary_window(self, username, start_date, end_date):
+        """Totals, progress and per-priority counts over a date range in O(log n)."""
+        self._ensure_summaries(username)
+        return self.summaries.window(username, start_date, end_date)
+
+    # -------------------------------------------------------------
+    # Columnar (Parquet/Arrow) analytics path
+    # -------------------------------------------------------------
+    def export_parquet(self, root=None):
+        """Exports all history to a username/month partitioned Parquet dataset."""
+        from agents.history_columnar import export_history
+
+        root = root or self.parquet_dir or "history_parquet"
+        return export_history(self._load_all_history(), root)
+
+    def _refresh_parquet_month(self, username, month):
+        """Rewrites the single (username, month) partition touched by a save."""
+        from agents.history_columnar import drop_partition, history_to_table, write_partitions
+
+        days = self.store.load_range(username, f"{month}-01", f"{month}-31")
+        table = history_to_table(username, days)
+        if table.num_rows:
+            write_partitions(table, self.parquet_dir)
+        else:
+            drop_partition(self.parquet_dir, username, month)
+
+    def query_tasks(self, username, start_date=None, end_date=None, as_pandas=True):
+        """
+        One row per task (username, date, task, priority, duration_min,
+        slot_start, slot_end, completed) for a user and date range. Reads the
+        Parquet mirror when one is configured, otherwise flattens the store.
+        """
+        from agents.history_columnar import history_to_table, query_tasks
+
+        if self.parquet_dir and os.path.isdir(self.parquet_dir):
+            table = query_tasks(self.parquet_dir, username, start_date, end_date)
+        else:
+            days = self.load_range(username, start_date or "0000-00-00", end_date or "9999-99-99")
+            table = history_to_table(username, days)
+        return table.to_pandas() if as_pandas else table
 
     def is_end_of_week(self):
         """Helper to determine if a weekly reflection should be triggered (e.g., on Sunday)."""
         # Monday is 0, Sunday is 6
-        return datetime.now().weekday() == 6
\ No newline at end of file
+        return datetime.now().weekday() == 6
@@ -0,0 +1,101 @@
+import os
+import shutil
+from datetime import date as date_cls
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from agents.durations import parse_duration
+from agents.time_slots import parse_slot_minutes
+
+# Default location of the partitioned Parquet mirror of history.
+HISTORY_PARQUET_DIR = "history_parquet"
+
+# One row per task; the dataset is hive-partitioned by username and month.
+TASK_SCHEMA = pa.schema([
+    ("username", pa.string()),
+    ("month", pa.string()),
+    ("date", pa.date32()),
+    ("task", pa.string()),
+    ("priority", pa.string()),
+    ("duration_min", pa.int32()),
+    ("slot_start", pa.int32()),  # minutes since midnight
+    ("slot_end", pa.int32()),    # minutes since midnight, +1440 when past midnight
+    ("completed", pa.bool_()),
+])
+PARTITIONING = ds.partitioning(
+    pa.schema([("username", pa.string()), ("month", pa.string())]), flavor="hive"
+)
+
+def _slot_minutes(slot):
+    """(start, end) minutes since midnight for "HH:MM AM - HH:MM PM"; (None, None) otherwise."""
+    return parse_slot_minutes(slot) or (None, None)
+
+
+def history_to_table(username, user_history):
+    """Flattens {date: {column: list}} for one user into a task-per-row Arrow table."""
+    columns = {name: [] for name in TASK_SCHEMA.names}
+    for date_str in sorted(user_history):
+        day = user_history[date_str]
+        tasks = day.get("Task", [])
+        n = len(tasks)
+        priorities = day.get("Priority", ["Medium"] * n)
+        times = day.get("Time", [None] * n)
+        slots = day.get("Time Slot", [None] * n)
+        completed = day.get("Completed", [False] * n)
+        day_value = date_cls.fromisoformat(date_str)
+
+        for i, task in enumerate(tasks):
+            start, end = _slot_minutes(slots[i]) if i < len(slots) else (None, None)
+            columns["username"].append(username)
+            columns["month"].append(date_str[:7])
+            columns["date"].append(day_value)
+            columns["task"].append(task)
+            columns["priority"].append(priorities[i] if i < len(priorities) else None)
+            columns["duration_min"].append(parse_duration(times[i], default=None) if i < len(times) else None)
+            columns["slot_start"].append(start)
+            columns["slot_end"].append(end)
+            columns["completed"].append(bool(completed[i]) if i < len(completed) else False)
+    return pa.table(columns, schema=TASK_SCHEMA)
+
+
+def write_partitions(table, root=HISTORY_PARQUET_DIR):
+    """Writes rows into root/username=<u>/month=<YYYY-MM>/, replacing those partitions."""
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=PARTITIONING,
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+    )
+
+
+def drop_partition(root, username, month):
+    """Removes one (username, month) partition, e.g. after its last day was cleared."""
+    path = os.path.join(root, f"username={quote(username, safe='')}", f"month={month}")
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def export_history(all_history, root=HISTORY_PARQUET_DIR):
+    """Exports the nested {username: {date: {column: list}}} layout; returns the row count."""
+    tables = [history_to_table(username, days) for username, days in all_history.items()]
+    table = pa.concat_tables(tables) if tables else TASK_SCHEMA.empty_table()
+    if table.num_rows:
+        write_partitions(table, root)
+    return table.num_rows
+
+
+def query_tasks(root, username, start_date=None, end_date=None, columns=None):
+    """
+    Reads one user's tasks for a date range. The username/month filters prune
+    partitions and the date filter is pushed down into the Parquet row groups.
+    """
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING, schema=TASK_SCHEMA)
+    expr = ds.field("username") == username
+    if start_date:
+        expr &= (ds.field("month") >= start_date[:7]) & (ds.field("date") >= date_cls.fromisoformat(start_date))
+    if end_date:
+        expr &= (ds.field("month") <= end_date[:7]) & (ds.field("date") <= date_cls.fromisoformat(end_date))
+    return dataset.to_table(columns=columns, filter=expr)
@@ -0,0 +1,538 @@
+import json
+import os
+import tempfile
+import threading
+from urllib.parse import quote, unquote
+
+import orjson
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Default locations for the history backends.
+HISTORY_FILE = "history.json"
+HISTORY_DB = "history.db"
+HISTORY_JOURNAL = "history.journal"
+HISTORY_SHARD_DIR = "history"
+
+# Fold the journal into the snapshot once either threshold is reached.
+JOURNAL_MAX_RECORDS = 200
+JOURNAL_MAX_BYTES = 1024 * 1024
+
+
+class _PathLock:
+    """
+    Exclusive writer lock for one path: a process-level RLock (threads serving
+    different Streamlit sessions) plus an OS lock on "<path>.lock" (other
+    server worker processes). Re-entrant within the owning thread.
+    """
+
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._handle = open(self.lock_path, 'a+b')
+                if fcntl:
+                    fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+                else:
+                    self._handle.seek(0)
+                    while True:
+                        try:
+                            msvcrt.locking(self._handle.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            # LK_LOCK gives up after ~10s; keep waiting for the other writer
+                            continue
+            except BaseException:
+                if self._handle:
+                    self._handle.close()
+                    self._handle = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            else:
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_UNLCK, 1)
+            self._handle.close()
+            self._handle = None
+        self._thread_lock.release()
+
+
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def write_lock(path):
+    """Returns the shared writer lock for a data file."""
+    lock_path = os.path.abspath(f"{path}.lock")
+    with _LOCKS_GUARD:
+        if lock_path not in _LOCKS:
+            _LOCKS[lock_path] = _PathLock(lock_path)
+        return _LOCKS[lock_path]
+
+
+def atomic_write(path, payload):
+    """
+    Writes bytes to a temp file in the same directory and renames it over
+    path, so lock-free readers only ever see the old or the new file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def file_version(path):
+    """Cheap change token for a file: (mtime_ns, size), or None if missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class JsonHistoryStore:
+    """Original single-document layout: {username: {date: {column: list}}}."""
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+
+    def load_all(self):
+        """Loads all existing history from the JSON file."""
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                try:
+                    return json.load(f)
+                except json.JSONDecodeError:
+                    # Return empty dict if file is corrupt or empty
+                    return {}
+        return {}
+
+    def save_all(self, data):
+        """Saves all history to the JSON file."""
+        with write_lock(self.path):
+            atomic_write(self.path, json.dumps(data, indent=4).encode())
+
+    def version(self, username):
+        """Token that changes whenever this user's stored history may have changed."""
+        return file_version(self.path)
+
+    def load_user(self, username):
+        """Returns {date: daily_data} for one user."""
+        return self.load_all().get(username, {})
+
+    def load_date(self, username, date):
+        """Returns the stored columns for one user and date, or None."""
+        return self.load_user(username).get(date)
+
+    def load_last_n_days(self, username, n):
+        """Returns the N most recent saved days for one user."""
+        user_history = self.load_user(username)
+        # Dates are sorted as strings, assuming YYYY-MM-DD format
+        sorted_dates = sorted(user_history.keys(), reverse=True)
+        return {date_str: user_history[date_str] for date_str in sorted_dates[:n]}
+
+    def load_range(self, username, start_date, end_date):
+        """Returns saved days with start_date <= date <= end_date (YYYY-MM-DD)."""
+        user_history = self.load_user(username)
+        return {
+            date_str: user_history[date_str]
+            for date_str in sorted(user_history)
+            if start_date <= date_str <= end_date
+        }
+
+    def save_day(self, username, date, daily_data):
+        """Load-modify-write of the whole document for a single day."""
+        # Hold the lock across the read so concurrent saves cannot drop each other
+        with write_lock(self.path):
+            data = self.load_all()
+            data.setdefault(username, {})[date] = daily_data
+            self.save_all(data)
+
+
+class JournalHistoryStore(JsonHistoryStore):
+    """
+    Write-ahead journal over the JSON snapshot. Each save appends one compact
+    orjson record to the journal; readers replay snapshot + journal tail. Once
+    the journal crosses a size/record threshold it is folded into a new
+    snapshot that atomically replaces the old one.
+    """
+
+    def __init__(self, path=HISTORY_FILE, journal_path=HISTORY_JOURNAL,
+                 max_records=JOURNAL_MAX_RECORDS, max_bytes=JOURNAL_MAX_BYTES):
+        super().__init__(path)
+        self.journal_path = journal_path
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self._repair_journal()
+        self._records = sum(1 for _ in self._read_journal())
+
+    def _repair_journal(self):
+        """Cuts a torn final record so the next append starts on a fresh line."""
+        with write_lock(self.path):
+            if not os.path.exists(self.journal_path):
+                return
+            with open(self.journal_path, 'rb+') as f:
+                content = f.read()
+                if content and not content.endswith(b"\n"):
+                    f.truncate(content.rfind(b"\n") + 1)
+
+    def _read_journal(self):
+        """Yields (username, date, daily_data) for every complete journal record."""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # A torn final line from a crash mid-append; everything before it is intact
+                    continue
+                yield record["username"], record["date"], record["data"]
+
+    def version(self, username):
+        """Changes with either the snapshot or the journal."""
+        return file_version(self.path), file_version(self.journal_path)
+
+    def load_all(self):
+        """Snapshot plus every journaled day replayed on top."""
+        data = super().load_all()
+        for username, date, daily_data in self._read_journal():
+            data.setdefault(username, {})[date] = daily_data
+        return data
+
+    def save_all(self, data):
+        """Writes a fresh snapshot atomically and empties the journal."""
+        with write_lock(self.path):
+            atomic_write(self.path, orjson.dumps(data, option=orjson.OPT_INDENT_2))
+            # Only drop the journal once the snapshot containing it is durable
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._records = 0
+
+    def save_day(self, username, date, daily_data):
+        """Appends one record; cost is independent of the history size."""
+        record = orjson.dumps({"username": username, "date": date, "data": daily_data}) + b"\n"
+        with write_lock(self.path):
+            with open(self.journal_path, 'ab') as f:
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+                journal_bytes = f.tell()
+            # Another writer may have compacted since our last save; resync the count
+            self._records = 1 if journal_bytes == len(record) else self._records + 1
+
+            if self._records >= self.max_records or journal_bytes >= self.max_bytes:
+                self.compact()
+
+    def compact(self):
+        """Folds the journal into the snapshot."""
+        with write_lock(self.path):
+            self.save_all(self.load_all())
+
+
+class ShardedHistoryStore:
+    """
+    One JSON shard per user (and per month when by_month is set) under a
+    directory, e.g. history/<user>/2025-11.json. Lookups for one user and
+    date range only open that user's matching shards.
+    """
+
+    def __init__(self, root=HISTORY_SHARD_DIR, by_month=True):
+        self.root = root
+        self.by_month = by_month
+
+    # Usernames are free text (spaces, slashes), so quote them for the filesystem
+    def _user_path(self, username):
+        name = quote(username, safe="")
+        return os.path.join(self.root, name if self.by_month else f"{name}.json")
+
+    def _shard_path(self, username, month):
+        return os.path.join(self._user_path(username), f"{month}.json")
+
+    def _path_for(self, username, date):
+        return self._shard_path(username, date[:7]) if self.by_month else self._user_path(username)
+
+    def _read(self, path):
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                try:
+                    return json.load(f)
+                except json.JSONDecodeError:
+                    return {}
+        return {}
+
+    def _write(self, path, days):
+        atomic_write(path, json.dumps(days, indent=4).encode())
+
+    def _months(self, username):
+        """Month keys (YYYY-MM) that have a shard for this user, oldest first."""
+        user_dir = self._user_path(username)
+        if not os.path.isdir(user_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(user_dir) if name.endswith(".json"))
+
+    def _usernames(self):
+        if not os.path.isdir(self.root):
+            return []
+        if self.by_month:
+            names = [n for n in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, n))]
+        else:
+            names = [n[:-5] for n in os.listdir(self.root) if n.endswith(".json")]
+        return [unquote(n) for n in names]
+
+    def version(self, username):
+        """Changes whenever one of this user's shards is written."""
+        if not self.by_month:
+            return file_version(self._user_path(username))
+        return tuple(
+            (month, file_version(self._shard_path(username, month)))
+            for month in self._months(username)
+        )
+
+    def load_all(self):
+        """Reads every shard back into the nested layout (migration/export only)."""
+        return {username: self.load_user(username) for username in self._usernames()}
+
+    def save_all(self, data):
+        """Rewrites the shards for every user in data."""
+        for username, days in data.items():
+            if self.by_month:
+                for month in self._months(username):
+                    path = self._shard_path(username, month)
+                    with write_lock(path):
+                        os.remove(path)
+            self._import_user(username, days, replace=True)
+
+    def import_all(self, data):
+        """Merges the nested JSON layout into the shards."""
+        for username, days in data.items():
+            self._import_user(username, days)
+
+    def _import_user(self, username, days, replace=False):
+        shards = {}
+        for date, daily_data in days.items():
+            shards.setdefault(self._path_for(username, date), {})[date] = daily_data
+        for path, shard_days in shards.items():
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with write_lock(path):
+                merged = {} if replace else self._read(path)
+                merged.update(shard_days)
+                self._write(path, merged)
+
+    def load_user(self, username):
+        """Returns {date: daily_data} for one user."""
+        if not self.by_month:
+            return self._read(self._user_path(username))
+        user_history = {}
+        for month in self._months(username):
+            user_history.update(self._read(self._shard_path(username, month)))
+        return user_history
+
+    def load_date(self, username, date):
+        """Returns the stored columns for one user and date, or None."""
+        return self._read(self._path_for(username, date)).get(date)
+
+    def load_last_n_days(self, username, n):
+        """Walks month shards newest-first and stops once N days are found."""
+        if not self.by_month:
+            user_history = self.load_user(username)
+            sorted_dates = sorted(user_history, reverse=True)[:n]
+            return {date_str: user_history[date_str] for date_str in sorted_dates}
+
+        last_n_history = {}
+        for month in reversed(self._months(username)):
+            shard = self._read(self._shard_path(username, month))
+            for date_str in sorted(shard, reverse=True):
+                if len(last_n_history) >= n:
+                    return last_n_history
+                last_n_history[date_str] = shard[date_str]
+        return last_n_history
+
+    def load_range(self, username, start_date, end_date):
+        """Returns saved days with start_date <= date <= end_date (YYYY-MM-DD)."""
+        if self.by_month:
+            user_history = {}
+            for month in self._months(username):
+                if start_date[:7] <= month <= end_date[:7]:
+                    user_history.update(self._read(self._shard_path(username, month)))
+        else:
+            user_history = self.load_user(username)
+        return {
+            date_str: user_history[date_str]
+            for date_str in sorted(user_history)
+            if start_date <= date_str <= end_date
+        }
+
+    def save_day(self, username, date, daily_data):
+        """Rewrites only the shard that holds this user and date."""
+        path = self._path_for(username, date)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with write_lock(path):
+            days = self._read(path)
+            days[date] = daily_data
+            self._write(path, days)
+
+
+class SqlHistoryStore:
+    """
+    SQLite (via SQLAlchemy) backend with one row per (username, date).
+    The composite primary key doubles as the (username, date) index, so a
+    single-day upsert and a last-N read only touch the rows they need.
+    """
+
+    def __init__(self, url=None):
+        # Deferred so the JSON backend does not pay for the SQLAlchemy import.
+        from sqlalchemy import Column, MetaData, String, Table, Text, create_engine
+
+        self.engine = create_engine(url or f"sqlite:///{HISTORY_DB}", future=True)
+        metadata = MetaData()
+        self.table = Table(
+            "history_days",
+            metadata,
+            Column("username", String, primary_key=True),
+            Column("date", String, primary_key=True),
+            Column("data", Text, nullable=False),
+        )
+        metadata.create_all(self.engine)
+
+    def version(self, username):
+        """File-backed SQLite databases change mtime on every commit."""
+        database = self.engine.url.database
+        return file_version(database) if database else None
+
+    def _upsert(self, conn, rows):
+        from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(self.table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["username", "date"],
+            set_={"data": stmt.excluded.data},
+        )
+        conn.execute(stmt, rows)
+
+    def load_all(self):
+        """Rebuilds the nested JSON layout from every row (migration/export only)."""
+        data = {}
+        with self.engine.connect() as conn:
+            for username, date, payload in conn.execute(self.table.select()):
+                data.setdefault(username, {})[date] = json.loads(payload)
+        return data
+
+    def save_all(self, data):
+        """Replaces the whole table with the nested JSON layout."""
+        with self.engine.begin() as conn:
+            conn.execute(self.table.delete())
+        self.import_all(data)
+
+    def import_all(self, data):
+        """Upserts every day from the nested JSON layout, keeping other rows."""
+        rows = [
+            {"username": username, "date": date, "data": json.dumps(daily_data)}
+            for username, days in data.items()
+            for date, daily_data in days.items()
+        ]
+        if rows:
+            with self.engine.begin() as conn:
+                self._upsert(conn, rows)
+
+    def load_user(self, username):
+        """Returns {date: daily_data} for one user."""
+        t = self.table
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                t.select().where(t.c.username == username).order_by(t.c.date)
+            )
+            return {row.date: json.loads(row.data) for row in rows}
+
+    def load_date(self, username, date):
+        """Returns the stored columns for one user and date, or None."""
+        t = self.table
+        with self.engine.connect() as conn:
+            payload = conn.execute(
+                t.select().with_only_columns(t.c.data)
+                .where(t.c.username == username, t.c.date == date)
+            ).scalar()
+        return json.loads(payload) if payload is not None else None
+
+    def load_last_n_days(self, username, n):
+        """Returns the N most recent saved days for one user."""
+        t = self.table
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                t.select()
+                .where(t.c.username == username)
+                .order_by(t.c.date.desc())
+                .limit(n)
+            )
+            return {row.date: json.loads(row.data) for row in rows}
+
+    def load_range(self, username, start_date, end_date):
+        """Returns saved days with start_date <= date <= end_date (YYYY-MM-DD)."""
+        t = self.table
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                t.select()
+                .where(t.c.username == username, t.c.date.between(start_date, end_date))
+                .order_by(t.c.date)
+            )
+            return {row.date: json.loads(row.data) for row in rows}
+
+    def save_day(self, username, date, daily_data):
+        """Upserts a single (username, date) row."""
+        with self.engine.begin() as conn:
+            self._upsert(conn, [{"username": username, "date": date, "data": json.dumps(daily_data)}])
+
+
+def get_history_store(backend="json"):
+    """Builds the store for a backend name ("json", "journal", "sharded" or "sqlite")."""
+    if backend == "json":
+        return JsonHistoryStore()
+    if backend == "journal":
+        return JournalHistoryStore()
+    if backend == "sharded":
+        return ShardedHistoryStore()
+    if backend == "sqlite":
+        return SqlHistoryStore()
+    raise ValueError(f"Unknown history backend: {backend!r}")
+
+
+def migrate_json_history(json_path=HISTORY_FILE, target=None):
+    """
+    One-shot migration of the legacy {username: {date: {column: list}}} file
+    into another store (SQLite by default, or e.g. ShardedHistoryStore()).
+    Returns the number of days copied.
+    """
+    data = JsonHistoryStore(json_path).load_all()
+    target = target if target is not None else SqlHistoryStore()
+    target.import_all(data)
+    return sum(len(days) for days in data.values())
+
+
+if __name__ == "__main__":
+    copied = migrate_json_history()
+    print(f"Migrated {copied} day(s) from {HISTORY_FILE} to {HISTORY_DB}.")
@@ -0,0 +1,199 @@
+import bisect
+import json
+import os
+from urllib.parse import quote
+
+import numpy as np
+
+from agents.history_store import atomic_write, file_version, write_lock
+from agents.profiling import count
+from agents.time_slots import parse_slot_minutes
+
+# Per-user summary files: history_summaries/<user>.json -> {date: summary}
+SUMMARY_DIR = "history_summaries"
+
+BASE_FIELDS = ["total", "completed", "minutes"]
+
+
+def _slot_span_minutes(slot):
+    """Scheduled minutes for "HH:MM AM - HH:MM PM" (0 for N/A or unparseable slots)."""
+    span = parse_slot_minutes(slot)
+    return span[1] - span[0] if span else 0
+
+
+def summarize_day(daily_data):
+    """
+    Pre-aggregates one saved day: task/completed counts, scheduled minutes and
+    {priority: [total, completed]}.
+    """
+    n = len(daily_data.get("Task", []))
+    completed = [bool(c) for c in (list(daily_data.get("Completed") or []) + [False] * n)[:n]]
+    priorities = (list(daily_data.get("Priority") or []) + ["Medium"] * n)[:n]
+    slots = (list(daily_data.get("Time Slot") or []) + [None] * n)[:n]
+
+    by_priority = {}
+    for priority, done in zip(priorities, completed):
+        if priority is None:
+            continue
+        counts = by_priority.setdefault(priority, [0, 0])
+        counts[0] += 1
+        counts[1] += int(done)
+
+    return {
+        "total": n,
+        "completed": sum(completed),
+        "minutes": sum(_slot_span_minutes(slot) for slot in slots),
+        "priority": by_priority,
+    }
+
+
+class _UserSummaries:
+    """
+    Sorted per-day summaries for one user plus prefix sums over every numeric
+    field, so any [start, end] window is two bisects and one subtraction.
+    A save only re-accumulates the prefix from the changed day onwards.
+    """
+
+    def __init__(self, days):
+        self.days = dict(days)
+        self.dates = sorted(self.days)
+        self._rebuild()
+
+    def _priority_fields(self):
+        names = sorted({p for s in self.days.values() for p in s["priority"]})
+        return [f"{p}:{kind}" for p in names for kind in ("total", "completed")]
+
+    def _vector(self, summary):
+        row = np.zeros(len(self.fields))
+        for i, field in enumerate(self.fields):
+            if ":" in field:
+                priority, kind = field.split(":", 1)
+                counts = summary["priority"].get(priority)
+                row[i] = counts[0 if kind == "total" else 1] if counts else 0
+            else:
+                row[i] = summary[field]
+        return row
+
+    def _rebuild(self):
+        self.fields = BASE_FIELDS + self._priority_fields()
+        self.rows = np.array([self._vector(self.days[d]) for d in self.dates]).reshape(len(self.dates), len(self.fields))
+        self.prefix = np.vstack([np.zeros((1, len(self.fields))), np.cumsum(self.rows, axis=0)])
+
+    def set_day(self, date, summary):
+        """Inserts/replaces one day and updates the prefix sums incrementally."""
+        new_priorities = any(f"{p}:total" not in self.fields for p in summary["priority"])
+        existed = date in self.days
+        self.days[date] = summary
+        if new_priorities:
+            if not existed:
+                bisect.insort(self.dates, date)
+            self._rebuild()
+            return
+
+        row = self._vector(summary)
+        i = bisect.bisect_left(self.dates, date)
+        if existed:
+            self.rows[i] = row
+        else:
+            self.dates.insert(i, date)
+            self.rows = np.insert(self.rows, i, row, axis=0)
+            self.prefix = np.insert(self.prefix, i + 1, 0, axis=0)
+        # Only days from i onwards see a different running total
+        self.prefix[i + 1:] = self.prefix[i] + np.cumsum(self.rows[i:], axis=0)
+
+    def window(self, start_date, end_date):
+        """Aggregate over saved days with start_date <= date <= end_date."""
+        lo = bisect.bisect_left(self.dates, start_date)
+        hi = bisect.bisect_right(self.dates, end_date)
+        sums = dict(zip(self.fields, (self.prefix[hi] - self.prefix[lo]).tolist()))
+
+        by_priority = {}
+        for field, value in sums.items():
+            if ":" in field and value:
+                priority, kind = field.split(":", 1)
+                by_priority.setdefault(priority, {"total": 0, "completed": 0})[kind] = int(value)
+
+        total = int(sums["total"])
+        completed = int(sums["completed"])
+        return {
+            "days": hi - lo,
+            "total": total,
+            "completed": completed,
+            "minutes": int(sums["minutes"]),
+            "progress": (completed / total) * 100 if total > 0 else 0,
+            "priority": by_priority,
+        }
+
+    def last_n(self, n):
+        """{date: summary} for the N most recent saved days, newest first."""
+        return {d: self.days[d] for d in reversed(self.dates[-n:])} if n > 0 else {}
+
+
+class DailySummaryIndex:
+    """Persists per-user, per-day summaries and serves rolling-window reads from memory."""
+
+    def __init__(self, root=SUMMARY_DIR):
+        self.root = root
+        # {username: (file token, _UserSummaries)}
+        self._loaded = {}
+
+    def _path(self, username):
+        return os.path.join(self.root, f"{quote(username, safe='')}.json")
+
+    def has(self, username):
+        return os.path.exists(self._path(username))
+
+    def _load(self, username):
+        """Cached _UserSummaries, re-read only when another writer changed the file."""
+        path = self._path(username)
+        token = file_version(path)
+        cached = self._loaded.get(username)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+
+        days = {}
+        if token is not None:
+            count("summaries.disk_reads")
+            with open(path, 'r') as f:
+                try:
+                    days = json.load(f)
+                except json.JSONDecodeError:
+                    days = {}
+        summaries = _UserSummaries(days)
+        self._loaded[username] = (token, summaries)
+        return summaries
+
+    def _persist(self, username, summaries):
+        path = self._path(username)
+        atomic_write(path, json.dumps(summaries.days, indent=4).encode())
+        self._loaded[username] = (file_version(path), summaries)
+
+    def update(self, username, date, daily_data):
+        """Called on every save: refreshes one day's summary."""
+        os.makedirs(self.root, exist_ok=True)
+        with write_lock(self._path(username)):
+            summaries = self._load(username)
+            summaries.set_day(date, summarize_day(daily_data))
+            self._persist(username, summaries)
+
+    def rebuild(self, username, user_history):
+        """One-time backfill from a user's full {date: daily_data} history."""
+        os.makedirs(self.root, exist_ok=True)
+        with write_lock(self._path(username)):
+            summaries = _UserSummaries({d: summarize_day(data) for d, data in user_history.items()})
+            self._persist(username, summaries)
+
+    def drop(self, username):
+        """Forgets a user's summaries so they are rebuilt on next access."""
+        self._loaded.pop(username, None)
+        if not os.path.isdir(self.root):
+            return
+        with write_lock(self._path(username)):
+            if os.path.exists(self._path(username)):
+                os.remove(self._path(username))
+
+    def last_n(self, username, n):
+        return self._load(username).last_n(n)
+
+    def window(self, username, start_date, end_date):
+        return self._load(username).window(start_date, end_date)
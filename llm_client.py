@@ -0,0 +1,69 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_MODEL = os.getenv("LIFELOOP_GEMINI_MODEL", "gemini-2.0-flash")
+# "gemini" (default) or "offline": the deterministic local stand-in in offline_llm.py,
+# tuned with LIFELOOP_OFFLINE_LATENCY / _JITTER / _FAILURE_RATE / _SEED.
+LLM_BACKEND = os.getenv("LIFELOOP_LLM_BACKEND", "gemini")
+
+# Process-wide clients and chains, built on first use. langchain_* is only
+# imported here, so sessions that never touch an AI action never load it.
+_CLIENTS = {}
+_CHAINS = {}
+_LOCK = threading.Lock()
+
+
+def default_model_name():
+    """Model id of the configured backend, without building a client."""
+    return "offline" if LLM_BACKEND == "offline" else GEMINI_MODEL
+
+
+def offline_llm(**overrides):
+    """Offline stand-in configured from the LIFELOOP_OFFLINE_* environment."""
+    from agents.offline_llm import OfflineChatModel
+
+    settings = {
+        "latency": float(os.getenv("LIFELOOP_OFFLINE_LATENCY", 0.0)),
+        "jitter": float(os.getenv("LIFELOOP_OFFLINE_JITTER", 0.0)),
+        "failure_rate": float(os.getenv("LIFELOOP_OFFLINE_FAILURE_RATE", 0.0)),
+        "seed": int(os.getenv("LIFELOOP_OFFLINE_SEED", 0)),
+    }
+    settings.update(overrides)
+    return OfflineChatModel(**settings)
+
+
+def get_llm(model=GEMINI_MODEL, temperature=0.7, backend=None):
+    """Shared chat client for (backend, model, temperature); safe to call from any thread."""
+    backend = backend or LLM_BACKEND
+    key = (backend, model, temperature)
+    with _LOCK:
+        if key not in _CLIENTS:
+            if backend == "offline":
+                _CLIENTS[key] = offline_llm()
+            elif backend == "gemini":
+                api_key = os.getenv("GOOGLE_API_KEY")
+                if not api_key:
+                    raise ValueError("Missing GOOGLE_API_KEY in environment.")
+                from langchain_google_genai import ChatGoogleGenerativeAI
+
+                _CLIENTS[key] = ChatGoogleGenerativeAI(model=model, temperature=temperature, api_key=api_key)
+            else:
+                raise ValueError(f"Unknown LLM backend: {backend!r}")
+        return _CLIENTS[key]
+
+
+def json_chain(template, llm):
+    """Cached `prompt | llm | JsonOutputParser()` for a prompt template and client."""
+    key = (template, id(llm))
+    with _LOCK:
+        if key not in _CHAINS:
+            from langchain_core.output_parsers import JsonOutputParser
+            from langchain_core.prompts import ChatPromptTemplate
+
+            # The client is kept alongside so its id() cannot be reused while cached
+            _CHAINS[key] = (ChatPromptTemplate.from_template(template) | llm | JsonOutputParser(), llm)
+        return _CHAINS[key][0]
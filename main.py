@@ -1,12 +1,10 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 import sys
 import os
 import json # New import for handling reflections archive
 from dotenv import load_dotenv
-from ics import Calendar, Event
 import io
 
 # ----------------------------------------------------------
@@ -20,66 +18,28 @@ load_dotenv()
 # 🧠 Import Agents
 # ----------------------------------------------------------
 # Ensure these files exist in your 'agents' directory.
+# LLM-backed agents (planner, reflection, weekly reflection) are imported lazily
+# in shared_agent() below, so langchain is only loaded on the first AI action.
 from agents.user_agent import UserAgent
-from agents.weekly_reflection_agent import WeeklyReflectionAgent
 from agents.history_agent import HistoryAgent 
-from agents.planner_agent import PlannerAgent
 from agents.ai_scheduler import AIScheduler
 from agents.context_agent import ContextAgent
-from agents.reflection_agent import ReflectionAgent
-from agents.visualization import plot_completion_bar, plot_status_pie 
-
-def generate_ics_file(df, active_date):
-    """
-    Converts the LifeLoop DataFrame into an .ics calendar file with Timezone support.
-    """
-    c = Calendar()
-    USER_TIMEZONE = 'US/Eastern' 
-
-    if isinstance(active_date, datetime):
-        base_date = active_date.date()
-    else:
-        base_date = active_date 
-
-    for _, row in df.iterrows():
-        time_slot = row['Time Slot']
-        task_name = row['Task']
-        
-        # Skip rows without valid time slots
-        if pd.isna(time_slot) or "N/A" in str(time_slot) or not time_slot:
-            continue
-
-        try:
-            # Parse start and end times
-            start_str, end_str = time_slot.split(" - ")
-            start_time = datetime.strptime(start_str.strip(), "%I:%M %p").time()
-            end_time = datetime.strptime(end_str.strip(), "%I:%M %p").time()
-
-            # Combine to make naive datetime (Year-Month-Day Hour:Minute)
-            start_dt_naive = datetime.combine(base_date, start_time)
-            end_dt_naive = datetime.combine(base_date, end_time)
-
-            # Handle overnight tasks
-            if end_dt_naive < start_dt_naive:
-                end_dt_naive += timedelta(days=1)
-
-            start_dt = pd.Timestamp(start_dt_naive).tz_localize(USER_TIMEZONE).to_pydatetime()
-            end_dt = pd.Timestamp(end_dt_naive).tz_localize(USER_TIMEZONE).to_pydatetime()
-
-            # Create the Event
-            e = Event()
-            e.name = f"LifeLoop: {task_name}"
-            e.begin = start_dt
-            e.end = end_dt
-            e.description = f"Priority: {row['Priority']}\nStatus: {'Done' if row['Completed'] else 'Pending'}"
-            
-            c.events.add(e)
-
-        except Exception as e:
-            print(f"Skipping row due to error: {e}")
-            continue
-
-    return c.serialize()
+from agents.daily_reflections import get_daily_reflection_store
+from agents.reflections_archive import ARCHIVE_PAGE_SIZE, get_reflection_archive
+from agents.charts import CHART_BACKEND, VEGA_SPECS, figure_function, render_chart
+from agents.metrics import metrics_from_summaries
+from agents.scheduling_engine import schedule_dataframe
+from agents.calendar_export import generate_ics_file, generate_ics_range
+from agents.durations import parse_duration, parse_durations
+from agents.time_slots import chronological, parse_slot_minutes, set_slot, window_minutes, with_slot_columns
+from agents.profiling import PROFILE_ENABLED, end_rerun, export_chrome_trace, section, span, start_rerun
+
+# Per-rerun spans/counters, only recorded with LIFELOOP_PROFILE=1
+start_rerun("main")
+section("page_setup")
+
+# Calendar export ranges: label -> number of days ending on the displayed date
+EXPORT_RANGES = {"This day": 1, "Last 7 days": 7, "Last 30 days": 30}
 
 # ----------------------------------------------------------
 # 🎨 Aesthetic Streamlit Page Config & Custom CSS (Dark Theme)
@@ -167,22 +127,411 @@ h1, h2, h3 {
 </style>
 """, unsafe_allow_html=True)
 
+# ----------------------------------------------------------
+# 🧠 Shared AI Agents (built on first use, one per server process)
+# ----------------------------------------------------------
+@st.cache_resource(show_spinner=False)
+def shared_agent(name):
+    """Creates an LLM-backed agent once for all sessions; its import is deferred too."""
+    if name == "planner":
+        from agents.planner_agent import PlannerAgent
+        return PlannerAgent()
+    if name == "reflector":
+        from agents.reflection_agent import ReflectionAgent
+        return ReflectionAgent()
+    if name == "weekly_agent":
+        from agents.weekly_reflection_agent import WeeklyReflectionAgent
+        return WeeklyReflectionAgent()
+    if name == "scheduler":
+        return AIScheduler()
+    raise KeyError(name)
+
+
+class LazyAgent:
+    """Placeholder kept in session state; the shared agent is built on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(shared_agent(self._name), attr)
+
+
+# ----------------------------------------------------------
+# 📈 Charts (LIFELOOP_CHART_BACKEND: matplotlib or vega)
+# ----------------------------------------------------------
+def show_chart(name, *args):
+    """Draws a dashboard chart with the configured backend."""
+    with span(f"chart.{name}"):
+        if CHART_BACKEND == "vega":
+            st.vega_lite_chart(VEGA_SPECS[name](*args), use_container_width=True, theme=None)
+        else:
+            st.image(render_chart(figure_function(name), *args), use_container_width=True)
+
+
+# ----------------------------------------------------------
+# 🧩 Page Fragments (rerun on their own widget changes only)
+# ----------------------------------------------------------
+# Each fragment reads only what it is passed or what lives in session state,
+# so a widget inside it reruns just that block instead of the whole script.
+# Actions that change the plan for other sections still call st.rerun().
+@st.fragment
+def task_timeline():
+    """Task Timeline editor and the Daily Review it feeds (plan: st.session_state.df)."""
+    st.markdown("##### Task Timeline")
+    # The data editor modifies st.session_state.df when interaction stops
+    with span("ui.data_editor.plan"):
+        edited_df = st.data_editor(
+            st.session_state.df,
+            column_order=("Time Slot", "Completed", "Priority", "Time", "Task"),
+            column_config={
+                "Completed": st.column_config.CheckboxColumn("Done", default=False),
+                "Task": st.column_config.TextColumn("Task Description"),
+                "Priority": st.column_config.SelectboxColumn("Priority", options=["High", "Medium", "Low"], required=True, disabled=True),
+                "Time": st.column_config.TextColumn("Duration", disabled=True),
+                "Time Slot": st.column_config.TextColumn("Time Slot", disabled=True)
+            },
+            disabled=("Priority", "Time", "Time Slot", "Task"), # Only Completed is editable
+            use_container_width=True,
+            key="task_data_editor"
+        )
+    st.session_state.df = edited_df # Ensure st.session_state.df is updated
+    st.session_state.context.df = edited_df # Update ContextAgent's DF
+
+    st.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
+    progress = st.session_state.context.progress()
+    st.markdown(f"#### 📈 Daily Review: {progress:.1f}% Complete")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("##### Overall Progress")
+        show_chart("completion_bar", progress)
+    with col2:
+        st.markdown("##### Status Distribution")
+        df_current = st.session_state.context.df 
+        task_data = [
+            {"task": t, "status": "completed" if c else "pending"}
+            for t, c in zip(df_current["Task"], df_current["Completed"])
+        ]
+        show_chart("status_pie", task_data)
+
+
+@st.fragment
+def calendar_export_panel(history_agent, username, date_key, display_date):
+    """Builds the .ics on request from the live plan (st.session_state.context.df)."""
+    export_days = st.selectbox(
+        "Export range",
+        options=list(EXPORT_RANGES),
+        key="ics_export_range",
+        label_visibility="collapsed",
+    )
+    # The calendar is only built once requested (download_button needs its data up front)
+    if st.button("📅 Export to Calendar", use_container_width=True):
+        st.session_state.ics_export = (date_key, export_days)
+
+    if st.session_state.get("ics_export") == (date_key, export_days):
+        with span("ics.export"):
+            n_days = EXPORT_RANGES[export_days]
+            if n_days == 1:
+                ics_content = generate_ics_file(st.session_state.context.df, display_date)
+            else:
+                range_start = (display_date - timedelta(days=n_days - 1)).strftime("%Y-%m-%d")
+                export_history = dict(history_agent.load_range(username, range_start, date_key))
+                export_history[date_key] = st.session_state.context.df  # include unsaved edits
+                ics_content = generate_ics_range(export_history.items())
+
+        st.download_button(
+            label="⬇️ Download .ics",
+            data=ics_content,
+            file_name=f"LifeLoop_Plan_{date_key}.ics" if n_days == 1 else f"LifeLoop_Plans_{range_start}_{date_key}.ics",
+            mime="text/calendar",
+            use_container_width=True,
+            help="Download a file to import into Google Calendar, Outlook, or Apple Calendar."
+        )
+
+
+@st.fragment
+def weekly_insights(history_agent, weekly_agent, username):
+    """Weekly metrics, charts and AI summary from the user's saved day summaries."""
+    st.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
+    st.subheader("🗓️ Weekly Insights & Patterns")
+
+    insight_window = st.selectbox(
+        "Insights Window",
+        options=[7, 30, 90],
+        format_func=lambda d: f"Last {d} days",
+        key="insight_window"
+    )
+
+    # Pre-aggregated per-day summaries (maintained by save_date), not raw task lists
+    day_summaries = history_agent.load_summaries(username, n=insight_window)
+
+    metrics, daily_progress, priority_df = metrics_from_summaries(day_summaries)
+
+    if metrics and metrics['Total Tasks'] > 0: # Check if we have actual data
+        col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+
+        # 1. Key Metrics
+        col_m1.metric(f"Total Tasks ({insight_window} Days)", metrics['Total Tasks'])
+        col_m2.metric("Completed Tasks", metrics['Completed Tasks'])
+        col_m3.metric("Average Progress", f"{metrics['Average Progress']:.1f}%")
+
+        # 2. Pattern Insights: the day with the max progress (computed by metrics_from_summaries)
+        highest_day = metrics['Most Productive Day']
+
+        if highest_day:
+            day_name = datetime.strptime(highest_day, "%Y-%m-%d").strftime("%A")
+            col_m4.metric("Most Productive Day", day_name, delta=f"{metrics['Most Productive Progress']:.1f}%")
+        else:
+            col_m4.metric("Most Productive Day", "N/A", delta="0.0%")
+
+
+        st.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
+
+        # 3. Charts
+        col_c1, col_c2 = st.columns(2)
+        with col_c1:
+            st.markdown("##### Daily Progress Over Time")
+            show_chart("daily_progress", daily_progress, insight_window)
+        with col_c2:
+            st.markdown("##### Task Status by Priority")
+            show_chart("priority_breakdown", priority_df)
+
+        st.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
+
+        # 4. AI Weekly Insights Button (WITH SAVE LOGIC)
+        if st.button("🧠 Generate AI Weekly Summary", use_container_width=True, key="generate_weekly_summary_btn"):
+            # Raw task lists are only needed for the AI summary itself
+            history_7_days = history_agent.load_last_n_days(username, n=7)
+            if not history_7_days:
+                st.error("Cannot generate summary: No history found for the last 7 days.")
+            else:
+                with st.spinner("Analyzing 7 days of data..."):
+                    # Call the generate_summary method
+                    summary_result = weekly_agent.generate_summary(history_7_days)
+
+                    st.session_state.weekly_summary = summary_result['summary']
+
+                    # --- ARCHIVE SAVE LOGIC ---
+                    try:
+                        # 1. Prepare the entry (timestamp + summary/metrics from agent output)
+                        new_entry = {
+                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                            "summary": summary_result['summary'],
+                            "metrics": summary_result.get('metrics', {}) 
+                        }
+
+                        # 2. Use the Agent's save_entry method 
+                        weekly_agent.save_entry(username, new_entry)
+
+                        st.toast("Weekly summary generated and **archived successfully**!")
+
+                    except Exception as e:
+                        st.error(f"Error saving weekly reflection to archive: {e}")
+                    # --- END ARCHIVE SAVE LOGIC ---
+
+        # Display AI Weekly Insights
+        if st.session_state.weekly_summary:
+            st.markdown("##### 💡 AI Weekly Insights")
+            st.info(st.session_state.weekly_summary)
+
+    else:
+        st.info("Log in and save some daily progress over the past week to view insights. (Minimum 1 day saved.)")
+
+
+@st.fragment
+def history_overview(history_agent, username):
+    """Last 7 days table and day picker (call inside `with st.sidebar`)."""
+    st.markdown("##### 🗓️ Last 7 Days Overview")
+
+    # Load the pre-aggregated daily summaries
+    history_data = history_agent.load_summaries(username, n=7)
+
+    if history_data:
+        history_list = []
+        # Sort history data by date chronologically (newest first for display)
+        sorted_dates = sorted(history_data.keys(), reverse=True)
+
+        # Prepare data for a simple display
+        for date in sorted_dates:
+            data = history_data[date]
+            completed_count = data["completed"]
+            total_count = data["total"]
+            progress = (completed_count / total_count) * 100 if total_count > 0 else 0
+            history_list.append({"Date": date, "Progress": f"{progress:.1f}%", "Tasks": total_count})
+
+        history_df = pd.DataFrame(history_list)
+
+        # Display the history data frame
+        st.dataframe(history_df, use_container_width=True, hide_index=True)
+
+        # --- Dropdown to Select the Day to Load/Edit ---
+        date_options = history_df['Date'].tolist()
+
+        # Pre-select the date currently in the backfill mode, or the newest one in the list
+        default_index = date_options.index(st.session_state.backfill_date) if st.session_state.backfill_date in date_options else 0
+
+        date_to_load = st.selectbox(
+            "Select a Date to Review/Edit:",
+            options=date_options,
+            index=default_index,
+            key="history_date_selector",
+            help="Select a date from your saved history to view or edit the tasks."
+        )
+
+        if st.button(f"Load Tasks for {date_to_load}", use_container_width=True, key="load_selected_history_btn"):
+            st.session_state.backfill_mode = True
+            st.session_state.backfill_date = date_to_load
+            st.rerun()
+
+    else:
+        st.info("No saved history found for the last 7 days.")
+
+
+@st.fragment
+def backfill_editor(history_agent, username, backfill_date_key):
+    """Editor for one saved (or missing) day; saving reruns the whole page."""
+    # Load existing data for that day
+    data_dict = history_agent.load_date(username, backfill_date_key)
+
+    if data_dict is not None:
+        # Data exists, load it into a DataFrame
+        try:
+            # Ensure all lists have the same length for DataFrame construction
+            lengths = {k: len(v) for k, v in data_dict.items() if isinstance(v, list)}
+            max_len = max(lengths.values()) if lengths else 0
+
+            # Pad lists to max length if necessary (though they should be consistent)
+            padded_data = {}
+            for k, v in data_dict.items():
+                 if isinstance(v, list):
+                    padded_data[k] = v + [None] * (max_len - len(v))
+                 else:
+                     padded_data[k] = [v] # Handle single values if structure is wrong
+
+            if max_len > 0:
+                 backfill_df = pd.DataFrame(padded_data)
+            else:
+                backfill_df = pd.DataFrame(columns=["Task", "Completed"])
+                st.warning(f"Data for {backfill_date_key} is empty.")
+
+        except Exception:
+            st.warning(f"Could not load data for {backfill_date_key}. File structure might be corrupt.")
+            backfill_df = pd.DataFrame(columns=["Task", "Completed"])
+    else:
+        # No data exists, provide a template
+        st.warning(f"No plan found for {backfill_date_key}. Enter tasks manually to save progress.")
+        # Create a template DF with the required columns for editing
+        backfill_df = pd.DataFrame([
+            {"Task": "Enter task 1 (e.g., Complete Report)", "Completed": False, "Priority": "Medium", "Time": "30 min", "Time Slot": "N/A"},
+            {"Task": "Enter task 2 (e.g., Exercise)", "Completed": False, "Priority": "Low", "Time": "1 hour", "Time Slot": "N/A"}
+        ])
+
+    st.subheader(f"✏️ Editing History: {backfill_date_key}")
+
+    # Data Editor for editing past tasks/completion status
+    with span("ui.data_editor.backfill"):
+        edited_backfill_df = st.data_editor(
+            backfill_df,
+            column_order=("Task", "Completed"),
+            column_config={
+                "Completed": st.column_config.CheckboxColumn("Done", default=False),
+                "Task": st.column_config.TextColumn("Task Description", required=True)
+            },
+            hide_index=True,
+            use_container_width=True,
+            num_rows="dynamic", # Allow adding/deleting rows for missing days
+            disabled=("Priority", "Time", "Time Slot"),
+            key="backfill_data_editor"
+        )
+
+    if st.button(f"💾 Save Progress for {backfill_date_key}", use_container_width=True, key="save_backfill_btn"):
+        # Ensure the saved DF has all required columns, even if blank/default
+        if "Time" not in edited_backfill_df.columns: edited_backfill_df["Time"] = edited_backfill_df.get("Time", ["30 min"] * len(edited_backfill_df))
+        if "Priority" not in edited_backfill_df.columns: edited_backfill_df["Priority"] = edited_backfill_df.get("Priority", ["Medium"] * len(edited_backfill_df))
+        if "Time Slot" not in edited_backfill_df.columns: edited_backfill_df["Time Slot"] = edited_backfill_df.get("Time Slot", ["N/A"] * len(edited_backfill_df))
+
+        history_agent.save_date(username, backfill_date_key, edited_backfill_df)
+        st.success(f"✅ History saved for {backfill_date_key}. Weekly analysis will include this data.")
+        st.session_state.backfill_mode = False # Exit backfill mode
+        st.rerun() # Rerun to update the main page context
+
+
+@st.fragment
+def weekly_archive(archive, username):
+    """Newest-first pages of the user's archived weekly reflections; paging reruns only this block."""
+    if not st.session_state.get("archive_open"):
+        return  # closed from inside the fragment
+    try:
+        total = archive.count(username)
+        if not total:
+            st.error(f"No weekly reflection archive found for user **{username}**.")
+            return
+
+        n_pages = -(-total // ARCHIVE_PAGE_SIZE)
+        page = min(st.session_state.get("archive_page", 0), n_pages - 1)
+
+        st.subheader("📘 Weekly Reflections Archive")
+        st.info(f"Found **{total}** archived reflections for user **{username}**.")
+
+        # Display each reflection of this page in an expander (newest first)
+        for reflection in archive.page(username, page):
+            timestamp = reflection.get("timestamp", "N/A")
+            summary = reflection.get("summary", "No summary found.")
+
+            # Display metrics if available
+            metrics = reflection.get("metrics", {})
+            metrics_str = " | ".join([
+                f"{k.capitalize()}: {v.get('completed', 0)}/{v.get('total', 0)}" 
+                for k, v in metrics.items()
+            ])
+
+            # Use overall metrics for the header if categorized metrics exist
+            overall_metrics = metrics.get('overall', {})
+            if overall_metrics:
+                 metrics_str = f"Progress: {overall_metrics.get('completed', 0)}/{overall_metrics.get('total', 0)}"
+
+            header_text = f"Reflection from: **{timestamp.split()[0]}**"
+            if metrics_str:
+                 header_text += f" ({metrics_str})"
+
+            with st.expander(header_text):
+                st.markdown(summary) # Summary is expected to be formatted with markdown (###, etc.)
+
+        col_newer, col_page, col_older, col_close = st.columns(4)
+        col_newer.button("‹ Newer", disabled=page == 0, use_container_width=True, key="archive_newer_btn",
+                         on_click=st.session_state.__setitem__, args=("archive_page", page - 1))
+        col_page.markdown(f"Page {page + 1} of {n_pages}")
+        col_older.button("Older ›", disabled=page >= n_pages - 1, use_container_width=True, key="archive_older_btn",
+                         on_click=st.session_state.__setitem__, args=("archive_page", page + 1))
+        col_close.button("Close", use_container_width=True, key="archive_close_btn",
+                         on_click=st.session_state.__setitem__, args=("archive_open", False))
+
+    except FileNotFoundError:
+        st.error("Weekly reflections file (`weekly_reflections.json`) not found. Ensure it exists in the root directory.")
+    except json.JSONDecodeError:
+        st.error("Weekly reflections file is empty or corrupted. Delete it to generate a new file.")
+    except Exception as e:
+        st.error(f"An error occurred while loading reflections: {e}")
+
+
 # ----------------------------------------------------------
 # 🔁 Session State & Agent Initialization
 # ----------------------------------------------------------
+section("session_state")
 # Initialize all agents and session variables
 if "user_agent" not in st.session_state:
     st.session_state.user_agent = UserAgent()
 if "weekly_agent" not in st.session_state:
-    st.session_state.weekly_agent = WeeklyReflectionAgent()
+    st.session_state.weekly_agent = LazyAgent("weekly_agent")
 if "history_agent" not in st.session_state:
     st.session_state.history_agent = HistoryAgent()
 if "planner" not in st.session_state:
-    st.session_state.planner = PlannerAgent()
+    st.session_state.planner = LazyAgent("planner")
 if "scheduler" not in st.session_state:
-    st.session_state.scheduler = AIScheduler()
+    st.session_state.scheduler = LazyAgent("scheduler")
 if "reflector" not in st.session_state:
-    st.session_state.reflector = ReflectionAgent()
+    st.session_state.reflector = LazyAgent("reflector")
 if "context" not in st.session_state:
     st.session_state.context = ContextAgent()
 
@@ -223,6 +572,7 @@ weekly_agent = st.session_state.weekly_agent
 # ----------------------------------------------------------
 # 👤 User Login/Switch Logic (Sidebar)
 # ----------------------------------------------------------
+section("sidebar.login")
 st.sidebar.title("🔑 User Context")
 
 new_username = st.sidebar.text_input(
@@ -259,6 +609,7 @@ else:
 # ----------------------------------------------------------
 # 📅 Main Content & Goal Input (DYNAMIC DATE LOGIC)
 # ----------------------------------------------------------
+section("main.header")
 st.title("♾️ LifeLoop: Your Adaptive Daily AI Planner")
 
 # --- Dynamic Date Determination ---
@@ -289,6 +640,7 @@ DATE_KEY = DISPLAY_DATE_KEY
 # ----------------------------------------------------------
 # ⚙️ Sidebar Configuration
 # ----------------------------------------------------------
+section("sidebar.config")
 st.sidebar.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
 st.sidebar.subheader("Planner Settings")
 
@@ -337,6 +689,7 @@ with st.container(border=True):
 # ----------------------------------------------------------
 # 1. GENERATE DRAFT PLAN (TASK LIST) 
 # ----------------------------------------------------------
+section("draft.generate")
 # Only allow planning if we are on the current day (not backfilling)
 if not is_backfilling:
     is_manual_mode = (scheduling_mode == "Manual (Fixed Slots)")
@@ -364,37 +717,8 @@ if not is_backfilling:
                     plan = planner.generate_plan(goal)
                     df_draft = context.load_tasks(plan)
                 
-                # --- Duration Parsing Logic (Kept from original AI flow) ---
-                task_minutes_list = []
-                for dur in df_draft["Time"]:
-                    mins = 0
-                    try:
-                        parts = dur.lower().split()
-                        for i, part in enumerate(parts):
-                            if 'hour' in part and i > 0:
-                                try:
-                                    num = int(parts[i - 1].replace('min', '').replace('hour', '').strip())
-                                    mins += num * 60
-                                except ValueError:
-                                    if 'hour' in parts[i-1]: mins += 60
-                            if 'min' in part and i > 0:
-                                try:
-                                    num = int(parts[i - 1].replace('min', '').replace('hour', '').strip())
-                                    mins += num
-                                except ValueError:
-                                    if 'min' in parts[i-1]: mins += 30
-                        if mins == 0: 
-                            try:
-                                mins = int(dur.split()[0])
-                            except:
-                                mins = 30
-                    except:
-                        mins = 30
-                    
-                    if mins <= 0: mins = 30 
-                    task_minutes_list.append(mins)
-                
-                df_draft['Duration_min'] = task_minutes_list
+                # --- Duration Parsing (one cached parse per distinct "Time" string) ---
+                df_draft['Duration_min'] = parse_durations(df_draft["Time"])
                 df_draft['Completed'] = False
                 st.success("✅ Draft task list generated. Review and confirm below.")
                 
@@ -406,6 +730,7 @@ if not is_backfilling:
 # ----------------------------------------------------------
 # 2. REVIEW DRAFT PLAN (EDITABLE TABLE) - FIXED LOGIC
 # ----------------------------------------------------------
+section("draft.review")
 if not st.session_state.draft_df.empty:
     st.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
     st.subheader("📝 Draft Plan Review (Step 2/3)")
@@ -452,48 +777,26 @@ if not st.session_state.draft_df.empty:
     # Hide Duration_min column
     df_for_editor = st.session_state.draft_df.drop(columns=['Duration_min'], errors='ignore')
 
-    edited_draft_df = st.data_editor(
-        df_for_editor,
-        column_order=("Task", "Priority", "Time", "Completed"),
-        column_config=column_config_map,
-        disabled=editor_disabled_cols, # This is where the editability is globally set per mode
-        use_container_width=True,
-        num_rows=num_rows_mode,
-        key="draft_plan_editor"
-    )
+    with span("ui.data_editor.draft"):
+        edited_draft_df = st.data_editor(
+            df_for_editor,
+            column_order=("Task", "Priority", "Time", "Completed"),
+            column_config=column_config_map,
+            disabled=editor_disabled_cols, # This is where the editability is globally set per mode
+            use_container_width=True,
+            num_rows=num_rows_mode,
+            key="draft_plan_editor"
+        )
     
     # --- Update st.session_state.draft_df based on editor results ---
     if not is_ai_full_control: 
         # This logic is applied whenever editing is allowed (Manual or Together)
         
-        # Custom simple time parsing for user-entered time strings
-        def simple_time_parse(dur_str):
-            dur_str = str(dur_str).lower()
-            mins = 0
-            try:
-                if 'hour' in dur_str:
-                    # Look for a number before 'hour', default to 1 if none found
-                    num_str = dur_str.split('hour')[0]
-                    num = int(''.join(filter(str.isdigit, num_str.strip())) or 1)
-                    mins += num * 60
-                if 'min' in dur_str or 'minute' in dur_str:
-                    # Look for a number before 'min', default to 30 if none found
-                    num_str = dur_str.split('min')[0]
-                    num = int(''.join(filter(str.isdigit, num_str.strip())) or 30)
-                    mins += num
-            except ValueError:
-                # Fallback if parsing fails (e.g., user just writes "30")
-                try:
-                    mins = int(''.join(filter(str.isdigit, dur_str.strip())))
-                except ValueError:
-                    mins = 30
-            return mins if mins > 0 else 30
-
         # Update the hidden Duration_min and the main draft_df
         st.session_state.draft_df = edited_draft_df.copy()
         # Only process Time column if it exists in the edited_draft_df
         if 'Time' in edited_draft_df.columns:
-            st.session_state.draft_df['Duration_min'] = edited_draft_df['Time'].apply(simple_time_parse)
+            st.session_state.draft_df['Duration_min'] = parse_durations(edited_draft_df['Time'])
         st.session_state.draft_df['Completed'] = False # Ensure we start planning with False
         
 
@@ -508,52 +811,16 @@ if not st.session_state.draft_df.empty:
             with st.spinner(f"⏱️ Scheduling plan using {scheduling_mode} mode..."):
                 
                 df_to_schedule = st.session_state.draft_df.copy()
-                total_task_minutes = df_to_schedule['Duration_min'].sum()
-                
-                # Scheduling Logic
-                total_work_minutes = (end_dt - start_dt).total_seconds() / 60
-                
-                # Distribute breaks evenly across the entire time window
-                num_tasks = len(df_to_schedule)
-                if num_tasks > 0 and total_work_minutes > total_task_minutes:
-                    total_free_time = total_work_minutes - total_task_minutes
-                    break_slots = num_tasks 
-                    inter_task_break_minutes = max(5, total_free_time / break_slots)
-                else:
-                    inter_task_break_minutes = 10 
-
-                # Separate and prioritize tasks
+                # Display order: day tasks by priority, evening tasks last
                 df_to_schedule['Is_Evening'] = df_to_schedule['Task'].str.lower().str.contains('dinner|evening|wind down|relax')
-                
-                # Use Priority to sort for initial scheduling
                 df_to_schedule['Priority_Sort'] = df_to_schedule['Priority'].map({'High': 3, 'Medium': 2, 'Low': 1})
                 df_to_schedule = df_to_schedule.sort_values(by=['Is_Evening', 'Priority_Sort'], ascending=[True, False]).reset_index(drop=True)
 
-                tasks_order = df_to_schedule.index.tolist()
-                
-                final_slots = [""] * len(df_to_schedule)
-                current_time = start_dt
-
-                for i, task_idx in enumerate(tasks_order):
-                    task_mins = int(df_to_schedule.loc[task_idx, 'Duration_min'])
-                    
-                    # Heuristic to push evening tasks later
-                    if df_to_schedule.loc[task_idx, 'Is_Evening'] and current_time < (end_dt - timedelta(minutes=90)):
-                        target_start = end_dt - timedelta(minutes=90) 
-                        current_time = max(current_time, target_start)
-
-                    end_time = current_time + timedelta(minutes=task_mins) 
-                    
-                    if end_time > end_dt:
-                        final_slots[task_idx] = "N/A - Too Late"
-                        continue
-                    
-                    final_slots[task_idx] = f"{current_time.strftime('%I:%M %p')} - {end_time.strftime('%I:%M %p')}"
-                    
-                    current_time = end_time + timedelta(minutes=int(inter_task_break_minutes)) 
-
+                # Pack all tasks at once (priority-weighted, minimal "Too Late" drops)
+                final_slots = schedule_dataframe(df_to_schedule, start_dt, end_dt)
 
                 df_to_schedule["Time Slot"] = final_slots
+                df_to_schedule = with_slot_columns(df_to_schedule, refresh=True)
 
                 # Finalize the session state
                 st.session_state.df = df_to_schedule.drop(columns=['Duration_min', 'Is_Evening', 'Priority_Sort'], errors='ignore')
@@ -566,6 +833,7 @@ if not st.session_state.draft_df.empty:
 # ----------------------------------------------------------
 # 📊 Display FINAL Plan, Mood Tracker, and Actions (Step 3/3)
 # ----------------------------------------------------------
+section("plan.final")
 # Exit backfill mode when viewing today's plan
 if not st.session_state.df.empty and st.session_state.get('backfill_mode') and DATE_KEY == datetime.now().strftime("%Y-%m-%d"):
      st.session_state.backfill_mode = False
@@ -582,21 +850,8 @@ if not df.empty and st.session_state.logged_in:
         st.subheader("🚀 Final Active Plan (Step 3/3)")
         
         # --- Chronological Sort (Ensure display is always sorted on load) ---
-        def sort_key(slot):
-            """Helper function to extract datetime object for sorting."""
-            if pd.isna(slot) or 'N/A' in str(slot):
-                return datetime.max
-            try:
-                start_str = str(slot).split(' - ')[0].strip()
-                return datetime.strptime(start_str, '%I:%M %p')
-            except Exception:
-                return datetime.max
-                
-        df = df.sort_values(
-            by="Time Slot", 
-            key=lambda x: x.apply(sort_key), 
-            ignore_index=True
-        )
+        # Integer Slot_Start/Slot_End columns: one parse per distinct slot, then an int sort
+        df = chronological(df)
         st.session_state.df = df # Update session state with the sorted DF
         st.session_state.context.df = st.session_state.df # Ensure context agent is also updated with the sort
         # ---------------------------------------------------
@@ -655,24 +910,7 @@ if not df.empty and st.session_state.logged_in:
 
 
         with col_table:
-            st.markdown("##### Task Timeline")
-            # The data editor modifies st.session_state.df when interaction stops
-            edited_df = st.data_editor(
-                df,
-                column_order=("Time Slot", "Completed", "Priority", "Time", "Task"),
-                column_config={
-                    "Completed": st.column_config.CheckboxColumn("Done", default=False),
-                    "Task": st.column_config.TextColumn("Task Description"),
-                    "Priority": st.column_config.SelectboxColumn("Priority", options=["High", "Medium", "Low"], required=True, disabled=True),
-                    "Time": st.column_config.TextColumn("Duration", disabled=True),
-                    "Time Slot": st.column_config.TextColumn("Time Slot", disabled=True)
-                },
-                disabled=("Priority", "Time", "Time Slot", "Task"), # Only Completed is editable
-                use_container_width=True,
-                key="task_data_editor"
-            )
-            st.session_state.df = edited_df # Ensure st.session_state.df is updated
-            st.session_state.context.df = edited_df # Update ContextAgent's DF
+            task_timeline()
 
 
         # ----------------------------------------------------------
@@ -710,17 +948,14 @@ if not df.empty and st.session_state.logged_in:
                     )
                     
                     if "time_slot" in result:
-                        st.session_state.df.at[task_idx, "Time Slot"] = result["time_slot"]
+                        st.session_state.df = set_slot(
+                            st.session_state.df, task_idx, *(parse_slot_minutes(result["time_slot"]) or (None, None)), label=result["time_slot"]
+                        )
                         st.session_state.df.at[task_idx, "Completed"] = False 
                         
                         # Update context and re-sort after AI reschedule
                         st.session_state.context.df = st.session_state.df 
-                        # Manually re-sort the dataframe based on the helper function
-                        st.session_state.df = st.session_state.df.sort_values(
-                            by="Time Slot", 
-                            key=lambda x: x.apply(sort_key), 
-                            ignore_index=True
-                        )
+                        st.session_state.df = chronological(st.session_state.df)
                         st.session_state.context.df = st.session_state.df # Update context again after sort
 
                         st.toast(f"✅ AI Rescheduled: {result['reason']}")
@@ -741,30 +976,45 @@ if not df.empty and st.session_state.logged_in:
                 st.toast(result) 
                 st.rerun() 
 
+        # Reschedule all skipped tasks (not done and already over, or "Too Late") in one AI call
+        plan_df = with_slot_columns(st.session_state.context.df)
+        plan_start, plan_end = window_minutes(start_time_str, end_time_str)
+        now_minutes = datetime.now().hour * 60 + datetime.now().minute
+        if plan_end > 24 * 60 and now_minutes < plan_start:
+            now_minutes += 24 * 60  # past midnight in an overnight window
+        skipped_mask = ~plan_df["Completed"].astype(bool) & (
+            plan_df["Slot_End"].isna() | (plan_df["Slot_End"] <= now_minutes).fillna(False)
+        )
+        skipped_rows = plan_df.index[skipped_mask.to_numpy()].tolist()
+
+        if st.button(f"⏩ Reschedule All Skipped ({len(skipped_rows)})", use_container_width=True, disabled=not skipped_rows):
+            with st.spinner(f"🧠 AI is rescheduling {len(skipped_rows)} skipped tasks..."):
+                results = scheduler.suggest_reschedule_batch(
+                    tasks=[
+                        {"task": plan_df.at[i, "Task"], "duration": parse_duration(plan_df.at[i, "Time"])}
+                        for i in skipped_rows
+                    ],
+                    pattern_summary=scheduler.analyze_user_pattern(),
+                    user_start=start_time_str,
+                    user_end=end_time_str,
+                    existing_slots=plan_df.loc[~skipped_mask.to_numpy(), "Time Slot"].tolist(),
+                    not_before=now_minutes
+                )
+                for i, result in zip(skipped_rows, results):
+                    plan_df = set_slot(
+                        plan_df, i, *(parse_slot_minutes(result["time_slot"]) or (None, None)), label=result["time_slot"]
+                    )
+                    plan_df.at[i, "Completed"] = False
 
-        # ----------------------------------------------------------
-        # 📊 Visualization & Reflection (Updated to Professional Look)
-        # ----------------------------------------------------------
-        st.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
-        progress = context.progress()
-        st.subheader(f"📈 Daily Review: {progress:.1f}% Complete")
-
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown("##### Overall Progress")
-            st.pyplot(plot_completion_bar(progress)) 
-        with col2:
-            st.markdown("##### Status Distribution")
-            df_current = st.session_state.context.df 
-            task_data = [
-                {"task": t, "status": "completed" if c else "pending"}
-                for t, c in zip(df_current["Task"], df_current["Completed"])
-            ]
-            st.pyplot(plot_status_pie(task_data))
+                st.session_state.df = chronological(plan_df)
+                st.session_state.context.df = st.session_state.df
+                moved = sum(r["time_slot"] != "N/A - Too Late" for r in results)
+                st.toast(f"✅ Rescheduled {moved} of {len(results)} skipped tasks.")
+            st.rerun()
 
 
         st.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
-        
+
         # Save, Export, and Reflection Actions
         col_save, col_reflect, col_export = st.columns([1, 1, 1])
 
@@ -781,226 +1031,24 @@ if not df.empty and st.session_state.logged_in:
                     for t, c in zip(df_current["Task"], df_current["Completed"])
                 ]
                 reflection = reflector.generate_summary(tasks_summary)
+                # Indexed per-user copy for date-range queries (rolling completion, history panels)
+                completed_count = sum(t["status"] == "completed" for t in tasks_summary)
+                get_daily_reflection_store().save(username, {
+                    "date": DATE_KEY,
+                    "completed_count": completed_count,
+                    "skipped_count": len(tasks_summary) - completed_count,
+                    **reflection,
+                })
                 
                 st.markdown("### 📘 Daily Reflection Summary")
                 st.info(f"**Summary:** {reflection['summary_text']}")
         
         with col_export:
-            ics_content = generate_ics_file(st.session_state.context.df, DISPLAY_DATE)
-            
-            st.download_button(
-                label="📅 Export to Calendar",
-                data=ics_content,
-                file_name=f"LifeLoop_Plan_{DATE_KEY}.ics",
-                mime="text/calendar",
-                use_container_width=True,
-                help="Download a file to import into Google Calendar, Outlook, or Apple Calendar."
-            )
+            calendar_export_panel(history_agent, username, DATE_KEY, DISPLAY_DATE)
 
         # --- NEW: Weekly Insights & Patterns Section ---
-
-        def calculate_weekly_metrics(history_data):
-            """Calculates key metrics from the last 7 days of history."""
-            if not history_data:
-                return None, None
-            
-            total_tasks = 0
-            completed_tasks = 0
-            daily_progress = {} # Date -> Progress %
-            
-            all_tasks_df = []
-
-            for date in sorted(history_data.keys()):
-                data = history_data[date]
-                completed = data.get("Completed", [])
-                tasks = data.get("Task", [])
-                priority = data.get("Priority", ["Medium"] * len(tasks)) # Default to Medium if missing
-
-                tasks_completed = sum(completed)
-                tasks_total = len(tasks)
-                
-                total_tasks += tasks_total
-                completed_tasks += tasks_completed
-                
-                progress = (tasks_completed / tasks_total) * 100 if tasks_total > 0 else 0
-                daily_progress[date] = progress
-                
-                # Compile all tasks into a single DF for priority breakdown
-                temp_df = pd.DataFrame({
-                    "Date": [date] * tasks_total,
-                    "Priority": priority,
-                    "Completed": completed
-                })
-                all_tasks_df.append(temp_df)
-
-            avg_progress = (completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0
-            
-            metrics = {
-                "Total Tasks": total_tasks,
-                "Completed Tasks": completed_tasks,
-                "Average Progress": avg_progress
-            }
-            
-            if all_tasks_df:
-                priority_df = pd.concat(all_tasks_df).groupby('Priority').agg(
-                    Total=('Completed', 'size'),
-                    Completed=('Completed', 'sum')
-                ).reset_index()
-            else:
-                priority_df = pd.DataFrame(columns=['Priority', 'Total', 'Completed'])
-
-
-            return metrics, daily_progress, priority_df
-
-        def plot_daily_progress(daily_progress):
-            """Generates a bar chart for daily progress."""
-            dates = sorted(daily_progress.keys())
-            progress = [daily_progress[date] for date in dates]
-            
-            # Use only day and month for cleaner x-axis labels
-            labels = [datetime.strptime(d, "%Y-%m-%d").strftime("%m/%d") for d in dates]
-
-            fig, ax = plt.subplots(figsize=(6, 3))
-            # Set dark theme background and colors for Matplotlib
-            fig.patch.set_facecolor('#0d1117')
-            ax.set_facecolor('#161b22')
-            ax.spines['bottom'].set_color('#c9d1d9')
-            ax.spines['top'].set_color('#161b22')
-            ax.spines['right'].set_color('#161b22')
-            ax.spines['left'].set_color('#c9d1d9')
-            ax.tick_params(axis='x', colors='#c9d1d9')
-            ax.tick_params(axis='y', colors='#c9d1d9')
-            ax.yaxis.label.set_color('#c9d1d9')
-            ax.title.set_color('#58a6ff')
-
-
-            ax.bar(labels, progress, color="#58a6ff")
-            ax.set_ylabel("Progress (%)")
-            ax.set_title("Task Completion Last 7 Days")
-            ax.tick_params(axis='x', rotation=45)
-            plt.tight_layout()
-            return fig
-
-        def plot_priority_breakdown(priority_df):
-            """Generates a stacked bar chart for task completion by priority."""
-            fig, ax = plt.subplots(figsize=(6, 3))
-            
-            # Set dark theme background and colors for Matplotlib
-            fig.patch.set_facecolor('#0d1117')
-            ax.set_facecolor('#161b22')
-            ax.spines['bottom'].set_color('#c9d1d9')
-            ax.spines['top'].set_color('#161b22')
-            ax.spines['right'].set_color('#161b22')
-            ax.spines['left'].set_color('#c9d1d9')
-            ax.tick_params(axis='x', colors='#c9d1d9')
-            ax.tick_params(axis='y', colors='#c9d1d9')
-            ax.yaxis.label.set_color('#c9d1d9')
-            ax.title.set_color('#58a6ff')
-
-            if priority_df.empty:
-                ax.text(0.5, 0.5, "No task data to display.", horizontalalignment='center', verticalalignment='center', color='#c9d1d9', transform=ax.transAxes)
-                return fig
-
-            # Calculate Pending tasks
-            priority_df['Pending'] = priority_df['Total'] - priority_df['Completed']
-
-            # Sort to ensure consistent order
-            priority_order = ['High', 'Medium', 'Low']
-            priority_df['SortOrder'] = priority_df['Priority'].apply(lambda x: priority_order.index(x) if x in priority_order else 99)
-            priority_df = priority_df.sort_values(by='SortOrder').drop(columns='SortOrder')
-
-            priorities = priority_df['Priority']
-            completed = priority_df['Completed']
-            pending = priority_df['Pending']
-
-            # Plot stacked bar
-            ax.bar(priorities, completed, label='Completed', color='#2f81f7')
-            ax.bar(priorities, pending, bottom=completed, label='Pending', color='#30363d')
-
-            ax.set_ylabel("Number of Tasks")
-            ax.set_title("Completion by Priority")
-            ax.legend(loc='upper left', bbox_to_anchor=(1, 1), facecolor='#161b22', edgecolor='#21262d', labelcolor='#c9d1d9')
-            plt.tight_layout()
-            return fig
-
-
-        st.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
-        st.subheader("🗓️ Weekly Insights & Patterns")
-
-        # Load history for the last 7 days
-        history_7_days = history_agent.load_last_n_days(username, n=7)
-        
-        metrics, daily_progress, priority_df = calculate_weekly_metrics(history_7_days)
-
-        if metrics and metrics['Total Tasks'] > 0: # Check if we have actual data
-            col_m1, col_m2, col_m3, col_m4 = st.columns(4)
-            
-            # 1. Key Metrics
-            col_m1.metric("Total Tasks (7 Days)", metrics['Total Tasks'])
-            col_m2.metric("Completed Tasks", metrics['Completed Tasks'])
-            col_m3.metric("Average Progress", f"{metrics['Average Progress']:.1f}%")
-            
-            # 2. Pattern Insights (Simple Placeholder)
-            # Find the day with the max progress from daily_progress
-            valid_daily_progress = {date: prog for date, prog in daily_progress.items() if prog > 0}
-            
-            if valid_daily_progress:
-                highest_day = max(valid_daily_progress, key=valid_daily_progress.get) 
-                day_name = datetime.strptime(highest_day, "%Y-%m-%d").strftime("%A")
-                col_m4.metric("Most Productive Day", day_name, delta=f"{valid_daily_progress.get(highest_day, 0):.1f}%")
-            else:
-                col_m4.metric("Most Productive Day", "N/A", delta="0.0%")
-            
-            
-            st.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
-            
-            # 3. Charts
-            col_c1, col_c2 = st.columns(2)
-            with col_c1:
-                st.markdown("##### Daily Progress Over Time")
-                st.pyplot(plot_daily_progress(daily_progress))
-            with col_c2:
-                st.markdown("##### Task Status by Priority")
-                st.pyplot(plot_priority_breakdown(priority_df))
-
-            st.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
-
-            # 4. AI Weekly Insights Button (WITH SAVE LOGIC)
-            if st.button("🧠 Generate AI Weekly Summary", use_container_width=True, key="generate_weekly_summary_btn"):
-                if not history_7_days:
-                    st.error("Cannot generate summary: No history found for the last 7 days.")
-                else:
-                    with st.spinner("Analyzing 7 days of data..."):
-                        # Call the generate_summary method
-                        summary_result = weekly_agent.generate_summary(history_7_days)
-                        
-                        st.session_state.weekly_summary = summary_result['summary']
-                        
-                        # --- ARCHIVE SAVE LOGIC ---
-                        try:
-                            # 1. Prepare the entry (timestamp + summary/metrics from agent output)
-                            new_entry = {
-                                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                "summary": summary_result['summary'],
-                                "metrics": summary_result.get('metrics', {}) 
-                            }
-                            
-                            # 2. Use the Agent's save_entry method 
-                            st.session_state.weekly_agent.save_entry(username, new_entry)
-                                
-                            st.toast("Weekly summary generated and **archived successfully**!")
-                            
-                        except Exception as e:
-                            st.error(f"Error saving weekly reflection to archive: {e}")
-                        # --- END ARCHIVE SAVE LOGIC ---
-                        
-            # Display AI Weekly Insights
-            if st.session_state.weekly_summary:
-                st.markdown("##### 💡 AI Weekly Insights")
-                st.info(st.session_state.weekly_summary)
-                
-        else:
-            st.info("Log in and save some daily progress over the past week to view insights. (Minimum 1 day saved.)")
+        section("plan.weekly_insights")
+        weekly_insights(history_agent, weekly_agent, username)
 
         # --- End NEW Section ---
 
@@ -1021,6 +1069,7 @@ else:
 # ----------------------------------------------------------
 # 📜 History Backfill & Review (Sidebar)
 # ----------------------------------------------------------
+section("sidebar.history")
 st.sidebar.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
 st.sidebar.subheader("History & Review")
 
@@ -1029,50 +1078,8 @@ if st.session_state.logged_in:
     # ---------------------------------------------------
     # NEW: Last 7 Days Overview & Clickable Load
     # ---------------------------------------------------
-    st.sidebar.markdown("##### 🗓️ Last 7 Days Overview")
-    
-    # Load the history data
-    history_data = history_agent.load_last_n_days(username, n=7)
-    
-    if history_data:
-        history_list = []
-        # Sort history data by date chronologically (newest first for display)
-        sorted_dates = sorted(history_data.keys(), reverse=True)
-        
-        # Prepare data for a simple display
-        for date in sorted_dates:
-            data = history_data[date]
-            completed_count = sum(data.get("Completed", []))
-            total_count = len(data.get("Completed", []))
-            progress = (completed_count / total_count) * 100 if total_count > 0 else 0
-            history_list.append({"Date": date, "Progress": f"{progress:.1f}%", "Tasks": total_count})
-        
-        history_df = pd.DataFrame(history_list)
-        
-        # Display the history data frame
-        st.sidebar.dataframe(history_df, use_container_width=True, hide_index=True)
-
-        # --- Dropdown to Select the Day to Load/Edit ---
-        date_options = history_df['Date'].tolist()
-        
-        # Pre-select the date currently in the backfill mode, or the newest one in the list
-        default_index = date_options.index(st.session_state.backfill_date) if st.session_state.backfill_date in date_options else 0
-        
-        date_to_load = st.sidebar.selectbox(
-            "Select a Date to Review/Edit:",
-            options=date_options,
-            index=default_index,
-            key="history_date_selector",
-            help="Select a date from your saved history to view or edit the tasks."
-        )
-
-        if st.sidebar.button(f"Load Tasks for {date_to_load}", use_container_width=True, key="load_selected_history_btn"):
-            st.session_state.backfill_mode = True
-            st.session_state.backfill_date = date_to_load
-            st.rerun()
-
-    else:
-        st.sidebar.info("No saved history found for the last 7 days.")
+    with st.sidebar:
+        history_overview(history_agent, username)
 
     # --- Original Calendar Input (Kept for manually choosing older days) ---
     st.sidebar.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
@@ -1096,127 +1103,39 @@ if st.session_state.logged_in:
 
     # --- Backfill Logic Display ---
     if st.session_state.get('backfill_mode') and st.session_state.get('backfill_date'):
-        backfill_date_key = st.session_state.backfill_date
-        
-        # Load existing data for that day
-        history_data = history_agent._load_all_history()
-        user_history = history_data.get(username, {})
-        
-        if backfill_date_key in user_history:
-            # Data exists, load it into a DataFrame
-            data_dict = user_history[backfill_date_key]
-            try:
-                # Ensure all lists have the same length for DataFrame construction
-                lengths = {k: len(v) for k, v in data_dict.items() if isinstance(v, list)}
-                max_len = max(lengths.values()) if lengths else 0
-                
-                # Pad lists to max length if necessary (though they should be consistent)
-                padded_data = {}
-                for k, v in data_dict.items():
-                     if isinstance(v, list):
-                        padded_data[k] = v + [None] * (max_len - len(v))
-                     else:
-                         padded_data[k] = [v] # Handle single values if structure is wrong
-                         
-                if max_len > 0:
-                     backfill_df = pd.DataFrame(padded_data)
-                else:
-                    backfill_df = pd.DataFrame(columns=["Task", "Completed"])
-                    st.warning(f"Data for {backfill_date_key} is empty.")
-            
-            except Exception:
-                st.warning(f"Could not load data for {backfill_date_key}. File structure might be corrupt.")
-                backfill_df = pd.DataFrame(columns=["Task", "Completed"])
-        else:
-            # No data exists, provide a template
-            st.warning(f"No plan found for {backfill_date_key}. Enter tasks manually to save progress.")
-            # Create a template DF with the required columns for editing
-            backfill_df = pd.DataFrame([
-                {"Task": "Enter task 1 (e.g., Complete Report)", "Completed": False, "Priority": "Medium", "Time": "30 min", "Time Slot": "N/A"},
-                {"Task": "Enter task 2 (e.g., Exercise)", "Completed": False, "Priority": "Low", "Time": "1 hour", "Time Slot": "N/A"}
-            ])
-        
-        st.subheader(f"✏️ Editing History: {backfill_date_key}")
-        
-        # Data Editor for editing past tasks/completion status
-        edited_backfill_df = st.data_editor(
-            backfill_df,
-            column_order=("Task", "Completed"),
-            column_config={
-                "Completed": st.column_config.CheckboxColumn("Done", default=False),
-                "Task": st.column_config.TextColumn("Task Description", required=True)
-            },
-            hide_index=True,
-            use_container_width=True,
-            num_rows="dynamic", # Allow adding/deleting rows for missing days
-            disabled=("Priority", "Time", "Time Slot"),
-            key="backfill_data_editor"
-        )
-        
-        if st.button(f"💾 Save Progress for {backfill_date_key}", use_container_width=True, key="save_backfill_btn"):
-            # Ensure the saved DF has all required columns, even if blank/default
-            if "Time" not in edited_backfill_df.columns: edited_backfill_df["Time"] = edited_backfill_df.get("Time", ["30 min"] * len(edited_backfill_df))
-            if "Priority" not in edited_backfill_df.columns: edited_backfill_df["Priority"] = edited_backfill_df.get("Priority", ["Medium"] * len(edited_backfill_df))
-            if "Time Slot" not in edited_backfill_df.columns: edited_backfill_df["Time Slot"] = edited_backfill_df.get("Time Slot", ["N/A"] * len(edited_backfill_df))
-            
-            history_agent.save_date(username, backfill_date_key, edited_backfill_df)
-            st.success(f"✅ History saved for {backfill_date_key}. Weekly analysis will include this data.")
-            st.session_state.backfill_mode = False # Exit backfill mode
-            st.rerun() # Rerun to update the main page context
+        backfill_editor(history_agent, username, st.session_state.backfill_date)
 
     # --- Weekly Reflections Archive Display ---
     st.sidebar.markdown('<div class="st_divider"></div>', unsafe_allow_html=True)
     if st.sidebar.button("Show Weekly Reflections Archive", use_container_width=True, key="show_weekly_btn"):
-        
-        try:
-            # Assumes 'weekly_reflections.json' is in the root directory (alongside main.py)
-            file_path = os.path.join(os.path.dirname(__file__), 'weekly_reflections.json')
-            
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                
-            user_reflections = data.get(username, []) # Load reflections for the active user
-            
-            if user_reflections:
-                st.subheader("📘 Weekly Reflections Archive")
-                st.info(f"Found **{len(user_reflections)}** archived reflections for user **{username}**.")
-                
-                # Display each reflection in an expander (newest first)
-                for i, reflection in enumerate(reversed(user_reflections)):
-                    timestamp = reflection.get("timestamp", "N/A")
-                    summary = reflection.get("summary", "No summary found.")
-                    
-                    # Display metrics if available
-                    metrics = reflection.get("metrics", {})
-                    metrics_str = " | ".join([
-                        f"{k.capitalize()}: {v.get('completed', 0)}/{v.get('total', 0)}" 
-                        for k, v in metrics.items()
-                    ])
-                    
-                    # Use overall metrics for the header if categorized metrics exist
-                    overall_metrics = metrics.get('overall', {})
-                    if overall_metrics:
-                         metrics_str = f"Progress: {overall_metrics.get('completed', 0)}/{overall_metrics.get('total', 0)}"
-
-                    header_text = f"Reflection from: **{timestamp.split()[0]}**"
-                    if metrics_str:
-                         header_text += f" ({metrics_str})"
-                         
-                    with st.expander(header_text):
-                        st.markdown(summary) # Summary is expected to be formatted with markdown (###, etc.)
-                        
-                # Reset backfill mode if the archive is displayed
-                st.session_state.backfill_mode = False
+        st.session_state.archive_open = True
+        st.session_state.archive_page = 0
+        # Reset backfill mode if the archive is displayed
+        st.session_state.backfill_mode = False
+
+    if st.session_state.get("archive_open"):
+        # Assumes 'weekly_reflections.json' is in the root directory (alongside main.py)
+        weekly_archive(get_reflection_archive(os.path.join(os.path.dirname(__file__), 'weekly_reflections.json')), username)
 
-            else:
-                st.error(f"No weekly reflection archive found for user **{username}**.")
-
-        except FileNotFoundError:
-            st.error("Weekly reflections file (`weekly_reflections.json`) not found. Ensure it exists in the root directory.")
-        except json.JSONDecodeError:
-            st.error("Weekly reflections file is empty or corrupted. Delete it to generate a new file.")
-        except Exception as e:
-            st.error(f"An error occurred while loading reflections: {e}")
-        
 else:
     st.sidebar.error("Please log in to use history features.")
+
+# ----------------------------------------------------------
+# ⏱️ Rerun Profile (LIFELOOP_PROFILE=1)
+# ----------------------------------------------------------
+rerun_profile = end_rerun()
+if PROFILE_ENABLED and rerun_profile:
+    with st.sidebar.expander(f"⏱️ Rerun Profile ({rerun_profile['total_ms']:.0f} ms)"):
+        st.dataframe(
+            pd.DataFrame.from_dict(rerun_profile["spans"], orient="index"),
+            use_container_width=True,
+        )
+        if rerun_profile["counters"]:
+            st.json(rerun_profile["counters"])
+        st.download_button(
+            label="Download Chrome Trace",
+            data=json.dumps(export_chrome_trace()),
+            file_name="lifeloop_trace.json",
+            mime="application/json",
+            help="Open in chrome://tracing, Perfetto or speedscope.",
+        )
@@ -0,0 +1,141 @@
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+
+def _fit(values, n, fill):
+    """Pads/truncates a stored column to the day's task count."""
+    values = list(values) if values is not None else []
+    return values[:n] + [fill] * (n - len(values))
+
+
+def history_frame(history_data):
+    """
+    Flattens {date: {column: list}} into one task-per-row frame (Date, Priority,
+    Completed) in a single pass, ordered by date.
+    """
+    dates = sorted(history_data)
+    counts = np.fromiter((len(history_data[d].get("Task", [])) for d in dates), dtype=np.int64, count=len(dates))
+    priorities = chain.from_iterable(
+        _fit(history_data[d].get("Priority"), n, "Medium") for d, n in zip(dates, counts)
+    )
+    completed = chain.from_iterable(
+        _fit(history_data[d].get("Completed"), n, False) for d, n in zip(dates, counts)
+    )
+    total = int(counts.sum())
+    return pd.DataFrame({
+        "Date": np.repeat(np.array(dates, dtype=object), counts),
+        "Priority": np.fromiter(priorities, dtype=object, count=total),
+        "Completed": np.fromiter((bool(c) for c in completed), dtype=bool, count=total),
+    })
+
+
+def calculate_metrics(history_data, last_n=None):
+    """
+    Key metrics over any window of history (7, 30, 365 days...).
+
+    Returns (metrics, daily_progress, priority_df):
+      metrics        -> totals, average progress and the most productive day
+      daily_progress -> {date: progress %}, oldest first
+      priority_df    -> Priority / Total / Completed per priority
+    On empty history, returns (None, {}, empty priority_df).
+    """
+    if last_n is not None:
+        history_data = {d: history_data[d] for d in sorted(history_data)[-last_n:]}
+    empty_priority = pd.DataFrame(columns=["Priority", "Total", "Completed"])
+    if not history_data:
+        return None, {}, empty_priority
+
+    dates = sorted(history_data)
+    frame = history_frame(history_data)
+    day_codes = np.repeat(np.arange(len(dates)), [len(history_data[d].get("Task", [])) for d in dates])
+    completed = frame["Completed"].to_numpy()
+
+    # Per-day progress with bincount instead of one DataFrame per day
+    day_totals = np.bincount(day_codes, minlength=len(dates))
+    day_done = np.bincount(day_codes, weights=completed, minlength=len(dates))
+    day_progress = np.divide(day_done, day_totals, out=np.zeros(len(dates)), where=day_totals > 0) * 100
+    daily_progress = dict(zip(dates, day_progress.tolist()))
+
+    total_tasks = int(day_totals.sum())
+    completed_tasks = int(day_done.sum())
+
+    # Most productive day: highest progress among days with any progress
+    best_day, best_progress = None, 0.0
+    if day_progress.size and day_progress.max() > 0:
+        best = int(day_progress.argmax())
+        best_day, best_progress = dates[best], float(day_progress[best])
+
+    metrics = {
+        "Total Tasks": total_tasks,
+        "Completed Tasks": completed_tasks,
+        "Average Progress": (completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0,
+        "Most Productive Day": best_day,
+        "Most Productive Progress": best_progress,
+    }
+
+    if total_tasks:
+        priority_codes, priority_labels = pd.factorize(frame["Priority"], sort=True)
+        # Missing priorities (code -1) are dropped, as groupby would
+        known = priority_codes >= 0
+        priority_codes, known_completed = priority_codes[known], completed[known]
+        priority_df = pd.DataFrame({
+            "Priority": priority_labels,
+            "Total": np.bincount(priority_codes, minlength=len(priority_labels)),
+            "Completed": np.bincount(priority_codes, weights=known_completed, minlength=len(priority_labels)).astype(int),
+        })
+    else:
+        priority_df = empty_priority
+
+    return metrics, daily_progress, priority_df
+
+
+def metrics_from_summaries(day_summaries):
+    """
+    Same (metrics, daily_progress, priority_df) as calculate_metrics, built
+    from HistoryAgent.load_summaries output instead of raw task lists.
+    """
+    empty_priority = pd.DataFrame(columns=["Priority", "Total", "Completed"])
+    if not day_summaries:
+        return None, {}, empty_priority
+
+    dates = sorted(day_summaries)
+    totals = np.array([day_summaries[d]["total"] for d in dates], dtype=float)
+    done = np.array([day_summaries[d]["completed"] for d in dates], dtype=float)
+    day_progress = np.divide(done, totals, out=np.zeros(len(dates)), where=totals > 0) * 100
+    daily_progress = dict(zip(dates, day_progress.tolist()))
+
+    total_tasks = int(totals.sum())
+    completed_tasks = int(done.sum())
+
+    best_day, best_progress = None, 0.0
+    if day_progress.size and day_progress.max() > 0:
+        best = int(day_progress.argmax())
+        best_day, best_progress = dates[best], float(day_progress[best])
+
+    metrics = {
+        "Total Tasks": total_tasks,
+        "Completed Tasks": completed_tasks,
+        "Average Progress": (completed_tasks / total_tasks) * 100 if total_tasks > 0 else 0,
+        "Most Productive Day": best_day,
+        "Most Productive Progress": best_progress,
+    }
+
+    by_priority = {}
+    for d in dates:
+        for priority, (total, completed) in day_summaries[d]["priority"].items():
+            counts = by_priority.setdefault(priority, [0, 0])
+            counts[0] += total
+            counts[1] += completed
+    if by_priority:
+        names = sorted(by_priority)
+        priority_df = pd.DataFrame({
+            "Priority": names,
+            "Total": [by_priority[p][0] for p in names],
+            "Completed": [by_priority[p][1] for p in names],
+        })
+    else:
+        priority_df = empty_priority
+
+    return metrics, daily_progress, priority_df
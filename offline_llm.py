@@ -0,0 +1,112 @@
+import asyncio
+import json
+import random
+import re
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from agents.free_slots import FreeSlotIndex
+from agents.time_slots import format_slot, parse_slot_minutes, window_minutes
+
+_WORKING_HOURS_RE = re.compile(r"Working hours:\s*(\d{1,2}:\d{2}\s*[AP]M)\s*-\s*(\d{1,2}:\d{2}\s*[AP]M)", re.IGNORECASE)
+_TASK_RE = re.compile(r"^Task:\s*(.+)$", re.MULTILINE)
+_BATCH_TASK_RE = re.compile(r"^(\d+):\s*(.+),\s*(\d+)\s*min$", re.MULTILINE)
+_BUSY_RE = re.compile(r"^Busy slots:\s*(.*)$", re.MULTILINE)
+
+
+def _stable_offset(text, modulo):
+    """Deterministic pseudo-random offset for a string (same across runs, unlike hash())."""
+    return zlib.crc32(text.encode()) % max(1, modulo)
+
+
+def rule_based_response(prompt):
+    """
+    JSON answer for the prompts this app sends: single and batch reschedules
+    get plausible slots inside the working hours; anything else gets a short
+    summary object.
+    """
+    hours = _WORKING_HOURS_RE.search(prompt)
+    window_start, window_end = window_minutes(*hours.groups()) if hours else (8 * 60, 21 * 60)
+
+    batch = _BATCH_TASK_RE.findall(prompt)
+    if batch:
+        # Packs the tasks into the gaps between the listed busy slots
+        busy_line = _BUSY_RE.search(prompt)
+        busy = [b for b in map(parse_slot_minutes, (busy_line.group(1) if busy_line else "").split(",")) if b]
+        slots = []
+        for task_id, name, duration in batch:
+            duration = int(duration)
+            start = FreeSlotIndex(busy, window_start, window_end).earliest(duration)
+            if start is None:
+                start = window_end - duration
+            busy.append((start, start + duration))
+            slots.append({"id": int(task_id), "time_slot": format_slot(start, start + duration), "reason": f"Offline slot for {name.strip()}."})
+        return {"slots": slots}
+
+    task = _TASK_RE.search(prompt)
+    if task:
+        # Somewhere in the window on a 15-minute grid, stable per task name
+        grid = max(1, (window_end - window_start - 30) // 15)
+        start = window_start + 15 * _stable_offset(task.group(1).strip().lower(), grid)
+        return {"time_slot": format_slot(start, start + 30), "reason": "Offline rule-based suggestion."}
+
+    return {"summary_text": "Offline summary: steady progress, keep the same routine.", "tasks": []}
+
+
+class OfflineChatModel(BaseChatModel):
+    """
+    Local stand-in for the Gemini chat model: answers with canned or
+    rule-generated JSON after a configurable latency, failing a configurable
+    fraction of calls. Seeded, so benchmark runs are reproducible.
+
+    canned maps a prompt substring to the JSON object returned for prompts
+    containing it (checked before the built-in rules).
+    """
+
+    model: str = "offline"
+    latency: float = 0.0       # seconds per call
+    jitter: float = 0.0        # extra uniform [0, jitter) seconds
+    failure_rate: float = 0.0  # fraction of calls raising RuntimeError
+    seed: int = 0
+    canned: Dict[str, Any] = {}
+    calls: int = 0
+    rng: Optional[Any] = None
+
+    @property
+    def _llm_type(self):
+        return "lifeloop-offline"
+
+    def _draw(self):
+        """(delay, fail) for the next call."""
+        if self.rng is None:
+            self.rng = random.Random(self.seed)
+        self.calls += 1
+        delay = self.latency + (self.rng.random() * self.jitter if self.jitter else 0.0)
+        return delay, self.rng.random() < self.failure_rate
+
+    def _respond(self, messages, fail):
+        if fail:
+            raise RuntimeError("Offline LLM: simulated provider failure.")
+        prompt = "\n".join(str(m.content) for m in messages)
+        payload = next((value for key, value in self.canned.items() if key in prompt), None)
+        if payload is None:
+            payload = rule_based_response(prompt)
+        message = AIMessage(content=json.dumps(payload))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, fail = self._draw()
+        if delay:
+            time.sleep(delay)
+        return self._respond(messages, fail)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        delay, fail = self._draw()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._respond(messages, fail)
@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Set LIFELOOP_PROFILE=1 to record spans and counters; everything below is a
+# no-op otherwise. Per-rerun summaries are appended to LIFELOOP_PROFILE_LOG
+# (JSON lines) and the last LIFELOOP_PROFILE_KEEP spans stay in memory for
+# Chrome trace export (chrome://tracing, Perfetto, speedscope).
+PROFILE_ENABLED = os.getenv("LIFELOOP_PROFILE", "").lower() in ("1", "true", "yes", "on")
+PROFILE_LOG = os.getenv("LIFELOOP_PROFILE_LOG", "profile.log")
+PROFILE_KEEP = int(os.getenv("LIFELOOP_PROFILE_KEEP", 50_000))
+
+_EPOCH = time.perf_counter()
+_local = threading.local()
+_spans = deque(maxlen=PROFILE_KEEP)  # (name, start_us, dur_us, thread_id, args)
+_spans_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+def _now_us():
+    return (time.perf_counter() - _EPOCH) * 1e6
+
+
+class _Rerun:
+    """Spans and counters of one script run in one session thread."""
+
+    def __init__(self, label):
+        self.label = label
+        self.started = _now_us()
+        self.spans = []  # (name, dur_ms)
+        self.counters = Counter()
+        self.section = None  # (name, start_us) of the open top-level section
+
+    def summary(self, interrupted=False):
+        totals = {}
+        for name, dur_ms in self.spans:
+            calls, total = totals.get(name, (0, 0.0))
+            totals[name] = (calls + 1, total + dur_ms)
+        return {
+            "rerun": self.label,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "total_ms": round((_now_us() - self.started) / 1000, 3),
+            "interrupted": interrupted,
+            "spans": {
+                name: {"calls": calls, "total_ms": round(total, 3)}
+                for name, (calls, total) in sorted(totals.items(), key=lambda kv: -kv[1][1])
+            },
+            "counters": dict(self.counters),
+        }
+
+
+def _record(rerun, name, start, args=None):
+    dur = _now_us() - start
+    if rerun is not None:
+        rerun.spans.append((name, dur / 1000))
+    with _spans_lock:
+        _spans.append((name, start, dur, threading.get_ident(), args or {}))
+
+
+def _close_section(rerun):
+    if rerun is not None and rerun.section is not None:
+        _record(rerun, *rerun.section)
+        rerun.section = None
+
+
+def _write_log(summary):
+    if not PROFILE_LOG:
+        return
+    with _log_lock, open(PROFILE_LOG, 'a') as f:
+        f.write(json.dumps(summary) + "\n")
+
+
+def start_rerun(label="rerun"):
+    """
+    Begins a per-rerun recording for the current thread. A previous run that
+    never reached end_rerun (st.rerun() / st.stop() raise mid-script) is
+    closed and logged as interrupted.
+    """
+    if not PROFILE_ENABLED:
+        return
+    previous = getattr(_local, "rerun", None)
+    if previous is not None:
+        _close_section(previous)
+        _write_log(previous.summary(interrupted=True))
+    _local.rerun = _Rerun(label)
+
+
+def end_rerun():
+    """Closes the current run, logs its summary and returns it (None when disabled)."""
+    rerun = getattr(_local, "rerun", None)
+    if not PROFILE_ENABLED or rerun is None:
+        return None
+    _local.rerun = None
+    _close_section(rerun)
+    summary = rerun.summary()
+    _write_log(summary)
+    _local.last_summary = summary
+    return summary
+
+
+def last_summary():
+    """Summary of the most recently finished run in this thread."""
+    return getattr(_local, "last_summary", None)
+
+
+@contextmanager
+def span(name, **args):
+    """Times a block as a named span (nested spans are fine)."""
+    if not PROFILE_ENABLED:
+        yield
+        return
+    rerun = getattr(_local, "rerun", None)
+    start = _now_us()
+    try:
+        yield
+    finally:
+        _record(rerun, name, start, args)
+
+
+def section(name):
+    """
+    Starts a named top-level section of the script, ending the previous one.
+    Suits flat Streamlit scripts where wrapping each block in `with span()`
+    would re-indent the whole page.
+    """
+    if not PROFILE_ENABLED:
+        return
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        _close_section(rerun)
+        rerun.section = (name, _now_us())
+
+
+def count(name, n=1):
+    """Adds to a per-rerun counter (disk reads, LLM calls, cache hits...)."""
+    if not PROFILE_ENABLED:
+        return
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        rerun.counters[name] += n
+
+
+def export_chrome_trace(path=None):
+    """
+    Recorded spans in Chrome trace-event format ("X" complete events, times in
+    microseconds). Written to path when given; the dict is returned either way.
+    """
+    with _spans_lock:
+        spans = list(_spans)
+    trace = {
+        "traceEvents": [
+            {"name": name, "ph": "X", "ts": round(start, 3), "dur": round(dur, 3),
+             "pid": os.getpid(), "tid": tid, "args": args}
+            for name, start, dur, tid, args in spans
+        ],
+        "displayTimeUnit": "ms",
+    }
+    if path:
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+    return trace
@@ -0,0 +1,77 @@
+import os
+import threading
+
+import orjson
+
+from agents.history_store import atomic_write, file_version, write_lock
+from agents.profiling import count
+
+# {username: [entry, ...]} with entries appended oldest first
+WEEKLY_REFLECTIONS_FILE = os.getenv("LIFELOOP_WEEKLY_REFLECTIONS", "weekly_reflections.json")
+ARCHIVE_PAGE_SIZE = int(os.getenv("LIFELOOP_ARCHIVE_PAGE_SIZE", 5))
+
+_ARCHIVES = {}
+_ARCHIVES_LOCK = threading.Lock()
+
+
+class ReflectionArchive:
+    """
+    Read side of the weekly reflections archive. The file is parsed once per
+    change (mtime/size token, so writes by WeeklyReflectionAgent.save_entry
+    or any other process invalidate it) into per-user lists shared by all
+    sessions; page() then only touches the K entries it returns.
+    """
+
+    def __init__(self, path=WEEKLY_REFLECTIONS_FILE):
+        self.path = path
+        self._users = {}
+        self._token = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        token = file_version(self.path)
+        if token == self._token:
+            return
+        users = {}
+        if token is not None:
+            count("reflections.disk_reads")
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            users = orjson.loads(raw) if raw.strip() else {}
+        self._users = users
+        self._token = token
+
+    def _entries(self, username):
+        with self._lock:
+            self._refresh()
+            return self._users.get(username) or []
+
+    def count(self, username):
+        return len(self._entries(username))
+
+    def page(self, username, page=0, per_page=ARCHIVE_PAGE_SIZE):
+        """Entries of one page, newest first (page 0 holds the latest reflections)."""
+        entries = self._entries(username)
+        end = len(entries) - page * per_page
+        if end <= 0:
+            return []
+        return entries[max(0, end - per_page):end][::-1]
+
+    def append(self, username, entry):
+        """Adds one entry under the writer lock and keeps the shared copy current."""
+        with self._lock, write_lock(self.path):
+            self._refresh()
+            users = dict(self._users)
+            users[username] = list(users.get(username) or []) + [entry]
+            atomic_write(self.path, orjson.dumps(users, option=orjson.OPT_INDENT_2))
+            self._users = users
+            self._token = file_version(self.path)
+
+
+def get_reflection_archive(path=WEEKLY_REFLECTIONS_FILE):
+    """Process-wide archive reader for a file (one parsed copy per server process)."""
+    key = os.path.abspath(path)
+    with _ARCHIVES_LOCK:
+        if key not in _ARCHIVES:
+            _ARCHIVES[key] = ReflectionArchive(path)
+        return _ARCHIVES[key]
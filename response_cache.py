@@ -0,0 +1,117 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+
+from agents.history_store import atomic_write, file_version, write_lock
+from agents.profiling import count
+
+# On-disk LLM response cache ("" disables persistence, the cache then lives in memory only).
+LLM_CACHE_FILE = os.getenv("LIFELOOP_LLM_CACHE", "llm_cache.json")
+LLM_CACHE_TTL = float(os.getenv("LIFELOOP_LLM_CACHE_TTL", 6 * 60 * 60))
+LLM_CACHE_SIZE = int(os.getenv("LIFELOOP_LLM_CACHE_SIZE", 512))
+
+
+def cache_key(*parts):
+    """Stable key for normalised prompt inputs (strings are case/whitespace folded)."""
+    normalised = [" ".join(p.lower().split()) if isinstance(p, str) else p for p in parts]
+    return hashlib.sha1(orjson.dumps(normalised)).hexdigest()
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of parsed LLM responses, served from memory and persisted
+    as [[key, stored_at, value], ...] (least recently used first). Writers
+    merge with whatever another worker saved in the meantime.
+    """
+
+    def __init__(self, path=LLM_CACHE_FILE, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._token = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _refresh(self):
+        """Reloads the file when another process changed it since our last read/write."""
+        if not self.path:
+            return
+        token = file_version(self.path)
+        if token == self._token:
+            return
+        entries = OrderedDict()
+        if token is not None:
+            try:
+                with open(self.path, 'rb') as f:
+                    rows = orjson.loads(f.read())
+                entries = OrderedDict((key, (stored_at, value)) for key, stored_at, value in rows)
+            except (OSError, ValueError, TypeError):
+                entries = OrderedDict()
+        # Keep our own in-memory recency for keys both sides know about
+        for key in self._entries:
+            if key in entries:
+                entries.move_to_end(key)
+        self._entries = entries
+        self._token = token
+
+    def _evict(self, now):
+        expired = [k for k, (stored_at, _) in self._entries.items() if now - stored_at > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Cached value or None; a hit marks the entry as most recently used."""
+        with self._lock:
+            if self._token is None:
+                self._refresh()
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            count("llm.cache_hits")
+            return entry[1]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            if not self.path:
+                self._entries[key] = (now, value)
+                self._entries.move_to_end(key)
+                self._evict(now)
+                return
+            with write_lock(self.path):
+                self._refresh()
+                self._entries[key] = (now, value)
+                self._entries.move_to_end(key)
+                self._evict(now)
+                rows = [[k, stored_at, v] for k, (stored_at, v) in self._entries.items()]
+                atomic_write(self.path, orjson.dumps(rows))
+                self._token = file_version(self.path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                with write_lock(self.path):
+                    atomic_write(self.path, b"[]")
+                    self._token = file_version(self.path)
+
+    def stats(self):
+        """Hit/miss counters, same shape as HistoryAgent.cache_stats."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,185 @@
+import re
+
+import numpy as np
+
+from agents.durations import DEFAULT_MINUTES, parse_durations
+from agents.free_slots import FreeSlotIndex
+from agents.time_slots import clock_to_minutes, format_slot
+
+PRIORITY_WEIGHTS = {"High": 3, "Medium": 2, "Low": 1}
+EVENING_PATTERN = re.compile(r"dinner|evening|wind down|relax", re.IGNORECASE)
+
+# Minimum gap kept between consecutive tasks, and how close to the end of the
+# window evening tasks (dinner, wind down...) are pushed.
+MIN_BREAK_MINUTES = 5
+EVENING_LEAD_MINUTES = 90
+TOO_LATE = "N/A - Too Late"
+
+
+def _select(durations, weights, capacity, min_break):
+    """
+    0/1 knapsack over minutes: picks the subset maximising priority-weighted
+    minutes that fits in the window (each task also reserves one break), with
+    the number of scheduled tasks as the tie-breaker. Returns a bool mask.
+    """
+    n = len(durations)
+    cost = durations + min_break
+    capacity = int(capacity + min_break)  # the last task needs no trailing break
+    if capacity <= 0:
+        return np.zeros(n, dtype=bool)
+
+    # value = weighted minutes, scaled so that one extra task never outweighs a minute
+    value = weights * durations * (n + 1) + 1
+    best = np.zeros(capacity + 1, dtype=np.int64)
+    take = np.zeros((n, capacity + 1), dtype=bool)
+    for i in range(n):
+        c = int(cost[i])
+        if c > capacity:
+            continue
+        candidate = best[:-c] + value[i] if c else best + value[i]
+        improved = candidate > best[c:]
+        take[i, c:] = improved
+        best[c:] = np.where(improved, candidate, best[c:])
+
+    mask = np.zeros(n, dtype=bool)
+    remaining = capacity
+    for i in range(n - 1, -1, -1):
+        if take[i, remaining]:
+            mask[i] = True
+            remaining -= int(cost[i])
+    return mask
+
+
+def schedule_tasks(tasks, window_start, window_end, fixed_blocks=(), min_break=MIN_BREAK_MINUTES):
+    """
+    Packs tasks into [window_start, window_end] (minutes since midnight; the
+    end may exceed 1440 for windows that run past midnight).
+
+    Each task is a dict with "duration" (minutes) and "priority", plus optional
+    "earliest"/"latest" bounds (minutes) and an "evening" flag. fixed_blocks
+    are (start, end) minutes that nothing may overlap.
+
+    Returns one (start, end) tuple per task in input order, or None for tasks
+    that cannot be placed ("Too Late").
+    """
+    n = len(tasks)
+    if n == 0:
+        return []
+    durations = np.array([max(1, int(t["duration"])) for t in tasks], dtype=np.int64)
+    weights = np.array([PRIORITY_WEIGHTS.get(t.get("priority"), 1) for t in tasks], dtype=np.int64)
+
+    blocked = sum(
+        max(0, min(e, window_end) - max(s, window_start)) for s, e in fixed_blocks
+    )
+    capacity = window_end - window_start - blocked
+
+    def release(i):
+        earliest = tasks[i].get("earliest")
+        if tasks[i].get("evening"):
+            earliest = max(earliest or window_start, window_end - EVENING_LEAD_MINUTES)
+        return max(window_start, earliest if earliest is not None else window_start)
+
+    def deadline(i):
+        latest = tasks[i].get("latest")
+        return min(window_end, latest) if latest is not None else window_end
+
+    def place(order, break_minutes):
+        """Sequential placement on the timeline in the given order."""
+        slots = [None] * n
+        free = FreeSlotIndex(fixed_blocks, window_start, window_end, step=1)
+        cursor = window_start
+        for i in order:
+            start = free.earliest(int(durations[i]), after=max(cursor, release(i)))
+            if start is None or start + durations[i] > deadline(i):
+                continue
+            slots[i] = (start, start + int(durations[i]))
+            cursor = slots[i][1] + break_minutes
+        return slots
+
+    def ordered(mask):
+        # Same order as the original greedy: day tasks by priority, evening tasks last
+        return sorted(
+            np.flatnonzero(mask).tolist(),
+            key=lambda i: (bool(tasks[i].get("evening")), release(i), -weights[i]),
+        )
+
+    def fill(slots):
+        # Fill whatever gaps remain with the unscheduled tasks, heaviest first
+        slots = list(slots)
+        leftovers = sorted((i for i in range(n) if slots[i] is None), key=lambda i: -weights[i] * durations[i])
+        for i in leftovers:
+            busy = list(fixed_blocks) + [slot for slot in slots if slot is not None]
+            free = FreeSlotIndex(busy, window_start, window_end, step=1)
+            start = free.earliest(int(durations[i]), after=release(i))
+            if start is not None and start + durations[i] <= deadline(i):
+                slots[i] = (start, start + int(durations[i]))
+        return slots
+
+    def score(slots):
+        # Priority-weighted scheduled minutes first, then fewest "Too Late" drops
+        placed = [i for i in range(n) if slots[i] is not None]
+        return int(sum(weights[i] * durations[i] for i in placed)), len(placed)
+
+    # Baseline: the original greedy (every task, breaks spread over the whole plan)
+    total = int(durations.sum())
+    greedy_break = int(max(min_break, (capacity - total) / n)) if capacity > total else 10
+    best = fill(place(ordered(np.ones(n, dtype=bool)), greedy_break))
+
+    # Tasks that cannot fit even in an empty window are dropped up front
+    candidates = np.array([release(i) + durations[i] <= deadline(i) for i in range(n)], dtype=bool)
+    while candidates.any() and best.count(None):
+        idx = np.flatnonzero(candidates)
+        # Only solve the knapsack when the day is over-committed
+        if durations[idx].sum() + min_break * (len(idx) - 1) <= capacity:
+            selected = candidates.copy()
+        else:
+            selected = np.zeros(n, dtype=bool)
+            selected[idx[_select(durations[idx], weights[idx], capacity, min_break)]] = True
+
+        order = ordered(selected)
+        slots = place(order, min_break)
+        if score(fill(slots)) > score(best):
+            best = fill(slots)
+
+        # Selected tasks the timeline could not honour (bounds, evening window,
+        # fixed blocks) leave the pool and the selection is solved again.
+        failed = [i for i in order if slots[i] is None]
+        if not failed:
+            break
+        candidates[failed] = False
+    return best
+
+
+def schedule_dataframe(df, start_dt, end_dt, fixed_blocks=()):
+    """
+    Adapter for the planner's draft DataFrame (Task, Priority, Duration_min, or
+    "Time" strings when Duration_min is missing, and optional "Earliest"/"Latest"
+    clock strings). Returns the "Time Slot" strings
+    in row order, with "N/A - Too Late" for tasks that did not fit.
+    """
+    window_start = start_dt.hour * 60 + start_dt.minute
+    window_end = window_start + int((end_dt - start_dt).total_seconds() // 60)
+
+    def bound(row, column):
+        value = row.get(column)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        minutes = clock_to_minutes(value)
+        # Bounds before the window start belong to the next day in overnight windows
+        return minutes + 24 * 60 if minutes < window_start and window_end > 24 * 60 else minutes
+
+    if "Duration_min" not in df.columns and "Time" in df.columns:
+        df = df.assign(Duration_min=parse_durations(df["Time"]))
+
+    tasks = [
+        {
+            "duration": row.get("Duration_min", DEFAULT_MINUTES),
+            "priority": row.get("Priority"),
+            "evening": bool(EVENING_PATTERN.search(str(row.get("Task", "")))),
+            "earliest": bound(row, "Earliest"),
+            "latest": bound(row, "Latest"),
+        }
+        for row in df.to_dict(orient="records")
+    ]
+    slots = schedule_tasks(tasks, window_start, window_end, fixed_blocks)
+    return [format_slot(*slot) if slot is not None else TOO_LATE for slot in slots]
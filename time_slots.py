@@ -0,0 +1,139 @@
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Slots are held as integer minutes since midnight. The end may run past 1440
+# for slots that cross midnight. "HH:MM AM - HH:MM PM" strings are only
+# parsed when a plan comes in and only rendered for the UI and exports.
+MINUTES_PER_DAY = 24 * 60
+SLOT_START = "Slot_Start"
+SLOT_END = "Slot_End"
+SLOT_COLUMNS = [SLOT_START, SLOT_END]
+
+
+@lru_cache(maxsize=4096)
+def clock_to_minutes(clock_str):
+    """ "09:30 PM" -> 1290 (minutes since midnight)."""
+    t = datetime.strptime(clock_str.strip(), "%I:%M %p")
+    return t.hour * 60 + t.minute
+
+
+def minutes_to_clock(minutes):
+    """1290 -> "09:30 PM" (wraps past midnight like strftime on a datetime)."""
+    hour, minute = divmod(int(minutes) % MINUTES_PER_DAY, 60)
+    return f"{hour % 12 or 12:02d}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+@lru_cache(maxsize=4096)
+def parse_slot_minutes(slot_str):
+    """
+    "HH:MM AM - HH:MM PM" (optionally tagged "(AI)") -> (start, end) minutes,
+    with end pushed past 1440 for slots that cross midnight. None if unparseable.
+    """
+    try:
+        start_str, end_str = [s.strip() for s in str(slot_str).replace("(AI)", "").split("-")]
+        start, end = clock_to_minutes(start_str), clock_to_minutes(end_str)
+    except (ValueError, AttributeError):
+        return None
+    if end < start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+def format_slot(start, end):
+    """(540, 570) -> "09:00 AM - 09:30 AM"."""
+    return f"{minutes_to_clock(start)} - {minutes_to_clock(end)}"
+
+
+def window_minutes(user_start, user_end):
+    """Work window clock strings -> (start, end) minutes; overnight windows end past 1440."""
+    start, end = clock_to_minutes(user_start), clock_to_minutes(user_end)
+    return start, end + MINUTES_PER_DAY if end <= start else end
+
+
+# ----------------------------------------------------------
+# Vectorized column helpers
+# ----------------------------------------------------------
+def slot_minutes(slots):
+    """
+    Slot strings -> (start, end) nullable Int64 Series (<NA> for "N/A"/blank).
+    Each distinct string is parsed once, so a plan costs one parse per slot value.
+    """
+    slots = pd.Series(slots)
+    codes, uniques = pd.factorize(slots, use_na_sentinel=True)
+    parsed = [parse_slot_minutes(s) or (-1, -1) for s in uniques]
+    table = np.array(parsed, dtype=np.int64).reshape(len(uniques), 2)
+    # One trailing row for missing values (code -1)
+    table = np.vstack([table, [[-1, -1]]])
+    picked = table[codes]
+    start = pd.Series(picked[:, 0], index=slots.index, dtype="Int64")
+    end = pd.Series(picked[:, 1], index=slots.index, dtype="Int64")
+    missing = start < 0
+    return start.mask(missing), end.mask(missing)
+
+
+def render_slots(start, end, missing="N/A - Too Late"):
+    """Int columns back to display strings; rows without a slot get `missing`."""
+    return [
+        missing if pd.isna(s) or pd.isna(e) else format_slot(s, e)
+        for s, e in zip(start, end)
+    ]
+
+
+def with_slot_columns(df, refresh=False):
+    """Adds Slot_Start/Slot_End derived from "Time Slot" (kept if already present)."""
+    if "Time Slot" not in df.columns or (not refresh and SLOT_START in df.columns and SLOT_END in df.columns):
+        return df
+    start, end = slot_minutes(df["Time Slot"])
+    return df.assign(**{SLOT_START: start, SLOT_END: end})
+
+
+def chronological(df):
+    """Plan sorted by slot start; unscheduled rows keep their order at the end."""
+    df = with_slot_columns(df)
+    if SLOT_START not in df.columns:
+        return df
+    return df.sort_values(SLOT_START, kind="stable", na_position="last", ignore_index=True)
+
+
+def set_slot(df, row, start, end, label=None):
+    """Writes one row's slot in both representations (label overrides the rendered string)."""
+    df = with_slot_columns(df)
+    df.at[row, SLOT_START] = start
+    df.at[row, SLOT_END] = end
+    df.at[row, "Time Slot"] = label or format_slot(start, end)
+    return df
+
+
+def shift_slots(df, rows, minutes):
+    """Moves the given rows by `minutes` (scalar or per-row array) and re-renders them."""
+    df = with_slot_columns(df)
+    start = df.loc[rows, SLOT_START] + minutes
+    end = df.loc[rows, SLOT_END] + minutes
+    df.loc[rows, SLOT_START] = start
+    df.loc[rows, SLOT_END] = end
+    df.loc[rows, "Time Slot"] = render_slots(start, end)
+    return df
+
+
+def overlapping(start, end):
+    """
+    Boolean mask of slots that overlap an earlier-starting slot (touching is
+    fine). Missing slots never overlap.
+    """
+    start = pd.Series(start, dtype="Int64")
+    end = pd.Series(end, dtype="Int64")
+    valid = (start.notna() & end.notna()).to_numpy()
+    s = start.to_numpy(dtype=np.int64, na_value=0)[valid]
+    e = end.to_numpy(dtype=np.int64, na_value=0)[valid]
+
+    order = np.argsort(s, kind="stable")
+    reach = np.maximum.accumulate(e[order])
+    hit = np.zeros(len(s), dtype=bool)
+    hit[order[1:]] = s[order[1:]] < reach[:-1]
+
+    mask = np.zeros(len(valid), dtype=bool)
+    mask[valid] = hit
+    return mask